@@ -0,0 +1,87 @@
+import os
+import wave
+import subprocess
+
+import numpy as np
+
+# --- СИНТЕТИЧЕСКИЕ ФИКСТУРЫ ---
+# Звук собирается из тона, шума и "речеподобных" всплесков (гармоники основного тона
+# с огибающей слогов, шипящие между слогами, паузы между фразами) — VAD находит в нем
+# речь (~2/3 длительности, как в живой лекции), а файлы создаются локально за секунды
+# и одинаковы на любой машине (фиксированный seed).
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+DEFAULT_SEED = 1
+
+
+def tone(seconds: float, freq: float = 220.0, level: float = 0.05, sr: int = SAMPLE_RATE) -> np.ndarray:
+    t = np.arange(int(seconds * sr), dtype=np.float32) / sr
+    return (level * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def noise(seconds: float, level: float = 0.01, sr: int = SAMPLE_RATE, seed: int = DEFAULT_SEED) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (level * rng.standard_normal(int(seconds * sr))).astype(np.float32)
+
+
+def speech_like(seconds: float, sr: int = SAMPLE_RATE, seed: int = DEFAULT_SEED,
+                burst_sec=(0.8, 4.0), pause_sec=(0.3, 4.0), hiss: float = 0.3) -> np.ndarray:
+    """Фразы случайной длины: основной тон 100-250 Гц с гармониками, слоги ~4 Гц, паузы между фразами.
+    hiss — шум между слогами (согласные): без него VAD почти не считает гармоники речью"""
+    rng = np.random.default_rng(seed)
+    out = np.zeros(int(seconds * sr), dtype=np.float32)
+    pos = int(rng.uniform(*pause_sec) * sr)
+    while pos < len(out):
+        n = min(int(rng.uniform(*burst_sec) * sr), len(out) - pos)
+        t = np.arange(n, dtype=np.float32) / sr
+        f0 = rng.uniform(100, 250) * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+        syllables = 0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3, 5) * t))
+        consonants = hiss * rng.standard_normal(n).astype(np.float32) * (1 - syllables) ** 4
+        out[pos:pos + n] = 0.2 * (voice * syllables + consonants)
+        pos += n + int(rng.uniform(*pause_sec) * sr)
+    return out
+
+
+def make_audio(seconds: float, sr: int = SAMPLE_RATE, seed: int = DEFAULT_SEED) -> np.ndarray:
+    """[каналы, сэмплы] float32: речь + фоновый тон + шум (в каналах немного разный шум)"""
+    voice = speech_like(seconds, sr, seed) + tone(seconds, 60.0, 0.03, sr)
+    return np.stack([voice + noise(seconds, 0.01, sr, seed + c) for c in range(CHANNELS)])
+
+
+def write_wav(path: str, pcm: np.ndarray, sr: int = SAMPLE_RATE):
+    frames = np.clip(np.rint(pcm.T * 32767), -32768, 32767).astype("<i2")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(pcm.shape[0])
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(np.ascontiguousarray(frames).tobytes())
+
+
+def make_video(ffmpeg_path: str, wav_path: str, video_path: str):
+    """Черная картинка 320x240 (10 кадров/сек, ключевой кадр раз в секунду) + звук из WAV"""
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin", "-y",
+           "-f", "lavfi", "-i", "color=c=black:s=320x240:r=10", "-i", wav_path, "-shortest",
+           "-c:v", "mpeg4", "-g", "10", "-c:a", "aac", "-b:a", "128k", video_path]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg: {result.stderr.strip()}")
+
+
+def ensure_fixtures(folder: str, minutes: float, ffmpeg_path: str, seed: int = DEFAULT_SEED) -> dict:
+    """Создает фикстуры один раз (имя зависит от длины и seed). {'audio', 'video', 'duration'}"""
+    os.makedirs(folder, exist_ok=True)
+    name = f"bench_{minutes:g}min_s{seed}"
+    audio_path = os.path.join(folder, name + ".wav")
+    video_path = os.path.join(folder, name + ".mp4")
+    if not os.path.exists(audio_path):
+        print(f"   🎼 Генерация звука: {minutes:g} мин")
+        write_wav(audio_path + ".tmp", make_audio(minutes * 60, seed=seed))
+        os.replace(audio_path + ".tmp", audio_path)
+    if not os.path.exists(video_path):
+        print(f"   🎞  Генерация видео: {os.path.basename(video_path)}")
+        make_video(ffmpeg_path, audio_path, video_path + ".tmp.mp4")
+        os.replace(video_path + ".tmp.mp4", video_path)
+    return {"audio": audio_path, "video": video_path, "duration": minutes * 60}
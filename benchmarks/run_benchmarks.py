@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+# --- ЗАМЕР ПРОИЗВОДИТЕЛЬНОСТИ ВСЕХ ИНСТРУМЕНТОВ ---
+# Синтетические фикстуры + легкие заглушки моделей: работает офлайн и без GPU.
+# Каждый этап запускается в отдельном процессе (честный пик памяти, холодный старт):
+#   split      — split_by_time.split_video_by_time (ffmpeg -c copy + манифест)
+#   separate   — spleeter clean_voice_final_v2: декодирование, цикл кусков, склейка MP3
+#   transcribe — AudioTranscriber.transcribe: декодирование в *.pcm16k, VAD, журнал
+# Результат сравнивается с сохраненной базой (baseline.json); регрессия — код возврата 1.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+STAGES = ("split", "separate", "transcribe")
+DEFAULT_MINUTES = 3
+DEFAULT_SPLIT_SEC = 60          # часть при нарезке (у инструмента 40 мин — для фикстуры слишком много)
+DEFAULT_TOLERANCE = 0.25        # +25% к времени, памяти или записи на диск — регрессия
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "spleeter_bench")
+COMPARED = ("wall_sec", "rtf", "peak_rss_mb", "disk_write_mb")
+RESULT_MARK = "BENCH_RESULT "
+
+
+def _use(tool):
+    path = os.path.join(ROOT, tool)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def get_ffmpeg_path():
+    if shutil.which("ffmpeg"):
+        return shutil.which("ffmpeg")
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def find_ffprobe(ffmpeg_path):
+    """ffprobe, который возьмет нарезка (рядом с ffmpeg или из PATH); None — если его нет.
+    В imageio_ffmpeg только ffmpeg: без системного ffprobe этап split не запустится"""
+    _use("splite_mediaFiles")
+    from media_probe import get_ffprobe_path
+    return shutil.which(get_ffprobe_path(ffmpeg_path))
+
+
+# --- МЕТРИКИ ПРОЦЕССА (этап + его дочерние ffmpeg) ---
+def peak_rss_mb():
+    try:
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: байты на macOS, КБ на Linux
+        peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return peak * scale / 1024**2
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024**2
+    except ImportError:
+        return None
+
+
+def disk_io():
+    """(прочитано, записано) байт с диска/на диск; None — если ОС не сообщает"""
+    if os.path.exists("/proc/self/io"):
+        counters = {}
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, value = line.split(":")
+                counters[key] = int(value)
+        import resource
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return (counters["read_bytes"] + children.ru_inblock * 512,
+                counters["write_bytes"] + children.ru_oublock * 512)
+    try:
+        import psutil
+        io = psutil.Process().io_counters()
+        return io.read_bytes, io.write_bytes
+    except (ImportError, AttributeError):
+        return None
+
+
+# --- ЭТАПЫ (в дочернем процессе) ---
+def stage_split(fixture, scratch, ffmpeg_path, split_sec):
+    _use("splite_mediaFiles")
+    import split_by_time
+    split_by_time.SPLIT_TIME_MIN = split_sec / 60
+    split_by_time.SPLIT_TIME_SEC = split_sec
+    video = os.path.join(scratch, os.path.basename(fixture["video"]))
+    shutil.copyfile(fixture["video"], video)
+    result = split_by_time.split_video_by_time(ffmpeg_path, video)
+    if result["status"] != "done":
+        raise RuntimeError(f"нарезка: {result['status']}")
+    return {"media_sec": result["duration"]}
+
+
+def stage_separate(fixture, scratch, ffmpeg_path, split_sec):
+    _use("spleeter")
+    from standins import StandInSeparator
+    import separator
+    stand_in = StandInSeparator()
+    separator.set_separator(stand_in)
+    import main as spleeter_main
+    ok = spleeter_main.clean_voice_final_v2(fixture["video"], workers=1, stem_cache=None,
+                                            work_dir=os.path.join(scratch, "work"), output_dir=scratch)
+    if not ok:
+        raise RuntimeError("clean_voice_final_v2 вернул False")
+    return {"media_sec": fixture["duration"], "model_sec": stand_in.busy}
+
+
+def stage_transcribe(fixture, scratch, ffmpeg_path, split_sec):
+    _use("transcription")
+    from standins import StandInWhisper
+    from speechToText import AudioTranscriber
+    audio = os.path.join(scratch, os.path.basename(fixture["audio"]))
+    shutil.copyfile(fixture["audio"], audio)
+    model = StandInWhisper()
+    app = AudioTranscriber("standin", ffmpeg_path=ffmpeg_path, model=model)
+    segments = app.transcribe(audio)
+    return {"media_sec": fixture["duration"], "model_sec": model.busy, "segments": len(segments)}
+
+
+STAGE_FUNCS = {"split": stage_split, "separate": stage_separate, "transcribe": stage_transcribe}
+
+
+def run_child(stage, fixture, ffmpeg_path, split_sec):
+    """Тело дочернего процесса: замер одного этапа, результат — последней строкой stdout"""
+    scratch = tempfile.mkdtemp(prefix=f"bench_{stage}_", dir=os.path.dirname(fixture["audio"]))
+    os.chdir(scratch)
+    try:
+        io_before = disk_io()
+        started = time.perf_counter()
+        result = STAGE_FUNCS[stage](fixture, scratch, ffmpeg_path, split_sec)
+        result["wall_sec"] = time.perf_counter() - started
+        io_after = disk_io()
+        result["rtf"] = result["wall_sec"] / result["media_sec"] if result["media_sec"] else None
+        result["peak_rss_mb"] = peak_rss_mb()
+        if io_before and io_after:
+            result["disk_read_mb"] = (io_after[0] - io_before[0]) / 1024**2
+            result["disk_write_mb"] = (io_after[1] - io_before[1]) / 1024**2
+    except ImportError as e:
+        result = {"skipped": f"нет модуля {e.name}"}
+    finally:
+        os.chdir(HERE)
+        shutil.rmtree(scratch, ignore_errors=True)
+    print(RESULT_MARK + json.dumps(result))
+
+
+def measure(stage, fixture, ffmpeg_path, split_sec, verbose=False):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", stage, "--fixture", json.dumps(fixture),
+           "--ffmpeg", ffmpeg_path, "--split-sec", str(split_sec)]
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    process = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True, encoding="utf-8",
+                             errors="ignore", env=env)
+    lines = process.stdout.splitlines()
+    if verbose:
+        print("\n".join(l for l in lines if not l.startswith(RESULT_MARK)))
+    for line in reversed(lines):
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    error = (process.stderr.strip() or process.stdout.strip()).splitlines()
+    return {"error": error[-1] if error else f"код {process.returncode}"}
+
+
+# --- ОТЧЕТ И БАЗА ---
+def _fmt(value, unit="", digits=1):
+    return "—" if value is None else f"{value:.{digits}f}{unit}"
+
+
+def print_report(results):
+    print(f"\n--- 📊 РЕЗУЛЬТАТЫ ---")
+    for stage, r in results.items():
+        if "error" in r or "skipped" in r:
+            mark = "❌" if "error" in r else "⏭"
+            print(f"   {mark} {stage:>10}: {r.get('error') or r.get('skipped')}")
+            continue
+        speed = f"x{1 / r['rtf']:.1f} реального времени" if r.get("rtf") else ""
+        line = (f"   ⏱ {stage:>10}: {r['wall_sec']:.2f} сек, RTF {_fmt(r.get('rtf'), digits=3)} ({speed}), "
+                f"пик памяти {_fmt(r.get('peak_rss_mb'), ' МБ', 0)}, "
+                f"диск: чтение {_fmt(r.get('disk_read_mb'), ' МБ')}, запись {_fmt(r.get('disk_write_mb'), ' МБ')}")
+        if r.get("model_sec") is not None:
+            line += f", модель {r['model_sec']:.2f} сек"
+        print(line)
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий: метрика выросла больше чем на tolerance относительно базы"""
+    regressions = []
+    print(f"\n--- 📐 СРАВНЕНИЕ С БАЗОЙ ({baseline.get('created', '?')}, {baseline.get('machine', '?')}) ---")
+    for stage, r in results.items():
+        base = baseline["stages"].get(stage)
+        if not base or "wall_sec" not in base or "wall_sec" not in r:
+            continue
+        for key in COMPARED:
+            old, new = base.get(key), r.get(key)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            mark = "❌" if change > tolerance else "✓"
+            print(f"   {mark} {stage:>10} {key:>13}: {old:.3f} -> {new:.3f} ({change * 100:+.0f}%)")
+            if change > tolerance:
+                regressions.append(f"{stage}.{key}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер скорости нарезки, очистки голоса и транскрипции")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Этапы через запятую: " + ",".join(STAGES))
+    parser.add_argument("--minutes", type=float, default=DEFAULT_MINUTES, help="Длина синтетического файла (мин)")
+    parser.add_argument("--split-sec", type=float, default=DEFAULT_SPLIT_SEC, help="Длина части при нарезке (сек)")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="Папка фикстур и временных файлов")
+    parser.add_argument("--ffmpeg", default=None, help="Путь к ffmpeg (ffprobe ищется рядом)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Файл базы для сравнения")
+    parser.add_argument("--save-baseline", action="store_true", help="Сохранить результат как новую базу")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Допустимый рост метрик (0.25 = 25%%)")
+    parser.add_argument("--verbose", action="store_true", help="Показывать вывод инструментов")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--fixture", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    ffmpeg_path = args.ffmpeg or get_ffmpeg_path()
+    if args.child:
+        run_child(args.child, json.loads(args.fixture), ffmpeg_path, args.split_sec)
+        return
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"неизвестные этапы: {', '.join(unknown)}")
+
+    from fixtures import ensure_fixtures
+    print(f"--- 🏁 ЗАМЕР: {', '.join(stages)} на {args.minutes:g} мин синтетики ---")
+    fixture = ensure_fixtures(args.work_dir, args.minutes, ffmpeg_path)
+
+    results = {}
+    for stage in stages:
+        print(f"   ▶ {stage}...")
+        if stage == "split" and not find_ffprobe(ffmpeg_path):
+            results[stage] = {"error": f"нет ffprobe ни рядом с {ffmpeg_path}, ни в PATH "
+                                       f"(в imageio_ffmpeg его нет) — поставьте ffmpeg или укажите --ffmpeg"}
+            continue
+        results[stage] = measure(stage, fixture, ffmpeg_path, args.split_sec, args.verbose)
+    print_report(results)
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("minutes") != args.minutes:
+            print(f"\n⚠️  База снята на {baseline.get('minutes')} мин, сейчас {args.minutes:g} — сравнение пропущено")
+        else:
+            regressions = compare(results, baseline, args.tolerance)
+    elif not args.save_baseline:
+        print(f"\nℹ️  Базы нет ({args.baseline}) — сохранить: --save-baseline")
+
+    if args.save_baseline:
+        data = {"created": time.strftime("%Y-%m-%d %H:%M"), "machine": platform.node(),
+                "python": platform.python_version(), "minutes": args.minutes, "stages": results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        print(f"\n💾 База сохранена: {args.baseline}")
+
+    # Пропущенный этап — тоже провал: иначе замер "проходит", ничего не измерив
+    skipped = [stage for stage, r in results.items() if "skipped" in r]
+    failed = regressions or skipped or any("error" in r for r in results.values())
+    if regressions:
+        print(f"\n❌ РЕГРЕССИЯ: {', '.join(regressions)}")
+    if skipped:
+        print(f"\n❌ НЕ ИЗМЕРЕНО: {', '.join(skipped)}")
+    print(f"\n   {'❌ Есть проблемы' if failed else '✅ Все в норме'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+
+# --- ЛЕГКИЕ ЗАГЛУШКИ МОДЕЛЕЙ ---
+# Тот же интерфейс, что у DemucsSeparator и WhisperModel, но без весов, GPU и сети.
+# Считают немного настоящей арифметики (БПФ), чтобы время модели было ненулевым и
+# стабильным — тогда в замере видно все остальное: декодирование, I/O, склейку, VAD.
+
+
+class StandInSeparator:
+    """Вместо Demucs: полосовой фильтр 80-4000 Гц через БПФ (separator.set_separator)"""
+
+    samplerate = 44100
+    audio_channels = 2
+    band = (80.0, 4000.0)
+
+    def __init__(self):
+        self.busy = 0.0
+
+    def settings(self) -> dict:
+        return {"model": "standin", "band": list(self.band)}
+
+    def separate_array(self, pcm: np.ndarray) -> np.ndarray:
+        started = time.perf_counter()
+        spectrum = np.fft.rfft(pcm, axis=1)
+        freqs = np.fft.rfftfreq(pcm.shape[1], 1.0 / self.samplerate)
+        spectrum[:, (freqs < self.band[0]) | (freqs > self.band[1])] = 0
+        vocals = np.fft.irfft(spectrum, n=pcm.shape[1], axis=1).astype(np.float32)
+        self.busy += time.perf_counter() - started
+        return vocals
+
+
+class StandInSegment:
+    """Как faster_whisper Segment: restore_speech_timestamps меняет start/end на месте"""
+
+    def __init__(self, start, end, text, words=None):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.words = words
+
+
+class StandInInfo:
+    def __init__(self, duration):
+        self.duration = duration
+        self.language = "ru"
+
+
+class StandInWhisper:
+    """Вместо WhisperModel: сегмент на каждые segment_sec звука, спектр каждого 30-секундного окна"""
+
+    sample_rate = 16000
+    window_sec = 30
+
+    def __init__(self, segment_sec: float = 5.0):
+        self.segment_sec = segment_sec
+        self.busy = 0.0
+        self.calls = 0
+
+    def transcribe(self, audio, **kwargs):
+        audio = np.asarray(audio, dtype=np.float32)
+        duration = len(audio) / self.sample_rate
+        self.calls += 1
+        return self._segments(audio, duration), StandInInfo(duration)
+
+    def _segments(self, audio, duration):
+        step = self.window_sec * self.sample_rate
+        n = 0
+        for window_start in range(0, len(audio), step):
+            started = time.perf_counter()
+            window = audio[window_start:window_start + step]
+            energy = float(np.abs(np.fft.rfft(window)).mean()) if len(window) else 0.0
+            window_end = min(duration, (window_start + step) / self.sample_rate)
+            t = window_start / self.sample_rate
+            segments = []
+            while t < window_end:
+                end = min(t + self.segment_sec, window_end)
+                segments.append(StandInSegment(t, end, f" фраза {n} ({energy:.2f})"))
+                n += 1
+                t = end
+            self.busy += time.perf_counter() - started
+            yield from segments
@@ -0,0 +1,9 @@
+@echo off
+chcp 65001 > nul
+
+:: Замер скорости всех инструментов на синтетике (без GPU и без скачивания моделей)
+:: Пример: start.bat --minutes 10 --save-baseline
+python run_benchmarks.py %*
+
+echo.
+pause
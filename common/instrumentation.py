@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+# --- ИЗМЕРЕНИЯ ДЛЯ ПРОДА: JSON-события + Prometheus textfile ---
+# По умолчанию выключено: get_metrics() отдает заглушку, у которой все методы пустые,
+# а timed_iter() возвращает итератор как есть — хуки можно не убирать из горячих циклов.
+# Включается флагами инструментов (--metrics-jsonl / --metrics-prom) или переменными
+# окружения TOOLS_METRICS_JSONL / TOOLS_METRICS_PROM.
+#
+#   metrics = get_metrics()
+#   with metrics.timer("decode", component="transcription"):          # -> decode_seconds
+#       audio = ...
+#   for segment in metrics.timed_iter(segments, "asr_segment_latency"):  # время на каждый элемент
+#       ...
+#   metrics.gauge("queue_depth", q.qsize(), queue="decode")
+#
+# JSONL: строка на событие {"ts", "pid", "event", ...}; пишется пачками раз в FLUSH_INTERVAL сек.
+# Prometheus: файл для textfile-коллектора node_exporter (tools_<имя>), перезаписывается атомарно.
+# Пик памяти процесса (peak_rss_bytes) добавляется при каждом сбросе.
+
+ENV_JSONL = "TOOLS_METRICS_JSONL"
+ENV_PROM = "TOOLS_METRICS_PROM"
+PROM_PREFIX = "tools_"
+FLUSH_INTERVAL = 5.0
+
+
+def peak_rss_bytes():
+    """Пик памяти процесса; None — если ОС не сообщает (Windows без psutil)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # macOS — байты, Linux — КБ
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return None
+
+
+class _NullTimer:
+    elapsed = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Измерения выключены: ничего не считается и не пишется"""
+
+    enabled = False
+
+    def event(self, name, **fields):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def gauge(self, name, value, **labels):
+        pass
+
+    def timer(self, name, **labels):
+        return _NULL_TIMER
+
+    def timed_iter(self, iterable, name, **labels):
+        return iterable
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started", "elapsed")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        if exc_type is None:
+            self.metrics.observe(self.name + "_seconds", self.elapsed, **self.labels)
+        return False
+
+
+def _label_key(labels: dict):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_labels(key) -> str:
+    if not key:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+class Metrics:
+    """Счетчики в памяти + буфер событий; на диск — раз в flush_interval сек и при закрытии"""
+
+    enabled = True
+
+    def __init__(self, jsonl_path: str = None, prom_path: str = None, flush_interval: float = FLUSH_INTERVAL):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.summaries = {}  # (имя, метки) -> [count, sum, max]
+        self.gauges = {}     # (имя, метки) -> значение
+        self.last_flush = time.monotonic()
+        self.closed = False
+
+    def event(self, name, **fields):
+        record = {"ts": round(time.time(), 3), "pid": self.pid, "event": name}
+        record.update(fields)
+        with self.lock:
+            if self.jsonl_path:
+                self.buffer.append(record)
+            due = time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def observe(self, name, value, **labels):
+        """Длительность или величина: в Prometheus — _sum/_count и _max, в JSONL — событие"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                summary = self.summaries[key] = [0, 0.0, value]
+            summary[0] += 1
+            summary[1] += value
+            if value > summary[2]:
+                summary[2] = value
+        self.event(name, value=round(value, 6), **labels)
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, _label_key(labels))] = value
+        self.event(name, value=value, **labels)
+
+    def timer(self, name, **labels):
+        return _Timer(self, name, labels)
+
+    def timed_iter(self, iterable, name, **labels):
+        """Время ожидания каждого элемента (декодирование блока, выдача сегмента моделью)"""
+        iterator = iter(iterable)
+        metric = name + "_seconds"
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(metric, time.perf_counter() - started, **labels)
+            yield item
+
+    def flush(self):
+        rss = peak_rss_bytes()
+        with self.lock:
+            self.last_flush = time.monotonic()
+            records, self.buffer = self.buffer, []
+            if rss:
+                self.gauges[("peak_rss_bytes", ())] = rss
+            summaries = {key: list(value) for key, value in self.summaries.items()}
+            gauges = dict(self.gauges)
+        try:
+            if records:
+                # Одна запись на пачку: несколько процессов (пул) могут дописывать в один файл
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+            if self.prom_path:
+                self._write_prom(summaries, gauges)
+        except OSError as e:
+            print(f"⚠️  Не удалось записать метрики: {e}")
+
+    def _write_prom(self, summaries, gauges):
+        lines = []
+        for name in sorted({n for n, _ in summaries}):
+            metric = PROM_PREFIX + name
+            lines.append(f"# TYPE {metric} summary")
+            for (n, key), (count, total, _) in sorted(summaries.items()):
+                if n == name:
+                    lines.append(f"{metric}_sum{_prom_labels(key)} {total:.6f}")
+                    lines.append(f"{metric}_count{_prom_labels(key)} {count}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            for (n, key), (_, _, peak) in sorted(summaries.items()):
+                if n == name:
+                    lines.append(f"{metric}_max{_prom_labels(key)} {peak:.6f}")
+        for name in sorted({n for n, _ in gauges}):
+            metric = PROM_PREFIX + name
+            lines.append(f"# TYPE {metric} gauge")
+            for (n, key), value in sorted(gauges.items()):
+                if n == name:
+                    lines.append(f"{metric}{_prom_labels(key)} {value}")
+        temp_path = self.prom_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.prom_path)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush()
+
+
+# --- ОДИН ОБЪЕКТ НА ПРОЦЕСС ---
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def configure(jsonl_path: str = None, prom_path: str = None):
+    """Включает измерения (пути из аргументов или переменных окружения). Без путей — заглушка"""
+    global _metrics
+    jsonl_path = jsonl_path or os.environ.get(ENV_JSONL)
+    prom_path = prom_path or os.environ.get(ENV_PROM)
+    with _metrics_lock:
+        if _metrics is not None:
+            _metrics.close()
+        _metrics = Metrics(jsonl_path, prom_path) if jsonl_path or prom_path else NullMetrics()
+    if jsonl_path:
+        # Процессы пулов наследуют окружение и дописывают события в тот же JSONL
+        os.environ[ENV_JSONL] = os.path.abspath(jsonl_path)
+    return _metrics
+
+
+def get_metrics():
+    if _metrics is None:
+        configure()
+    return _metrics
+
+
+@atexit.register
+def _close_at_exit():
+    if _metrics is not None:
+        _metrics.close()
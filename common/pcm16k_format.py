@@ -0,0 +1,41 @@
+import struct
+
+# --- ФОРМАТ *.pcm16k: ОБЩИЙ ДЛЯ SPLEETER И TRANSCRIPTION ---
+# Заголовок 64 байта + сырые сэмплы 16 кГц моно. Пишет spleeter (pcm16k.Pcm16kWriter, вместе с MP3)
+# и transcription (audio_cache, кэш декодирования), читает transcription через np.memmap.
+# В заголовке — размер и mtime исходника: по ним видно, что файл устарел (0 — не привязан к исходнику).
+
+SAMPLE_RATE = 16000
+PCM16K_EXT = ".pcm16k"
+
+MAGIC = b"PCM16K\x00\x01"
+VERSION = 1
+DTYPE_FLOAT32 = 1
+DTYPE_INT16 = 2
+DTYPES = {DTYPE_FLOAT32: "<f4", DTYPE_INT16: "<i2"}
+
+# magic, версия, тип сэмплов, частота, каналы, число сэмплов, размер и mtime исходника
+HEADER = struct.Struct("<8sHHIIQQq")
+HEADER_SIZE = 64
+
+
+def pack_header(num_samples: int, source_size: int = 0, source_mtime_ns: int = 0,
+                dtype_code: int = DTYPE_FLOAT32, sample_rate: int = SAMPLE_RATE, channels: int = 1) -> bytes:
+    header = HEADER.pack(MAGIC, VERSION, dtype_code, sample_rate, channels, num_samples,
+                         source_size, source_mtime_ns)
+    return header.ljust(HEADER_SIZE, b"\x00")
+
+
+def unpack_header(raw: bytes, path: str = "") -> dict:
+    """raw — первые HEADER_SIZE байт файла; ValueError — если это не *.pcm16k"""
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"Поврежденный кэш: {path}")
+    magic, version, dtype_code, sample_rate, channels, num_samples, source_size, source_mtime_ns = \
+        HEADER.unpack(raw[:HEADER.size])
+    if magic != MAGIC or dtype_code not in DTYPES:
+        raise ValueError(f"Не PCM-кэш: {path}")
+    return {
+        "version": version, "dtype": DTYPES[dtype_code], "sample_rate": sample_rate,
+        "channels": channels, "num_samples": num_samples,
+        "source_size": source_size, "source_mtime_ns": source_mtime_ns,
+    }
@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import subprocess
+
+import numpy as np
+
+# --- КОНВЕЙЕР: ВИДЕО -> ЧИСТЫЙ ГОЛОС -> ТЕКСТ ЗА ОДИН ПРОХОД ---
+# Три этапа работают одновременно, каждый в своем потоке:
+#   декодирование (ffmpeg) -> разделение (Demucs) -> распознавание (Whisper)
+# Пока Whisper распознает кусок N, Demucs чистит N+1, а ffmpeg декодирует N+2.
+# Между этапами — очереди ограниченного размера: быстрый этап ждет медленный,
+# и в памяти никогда не копится больше нескольких кусков.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for tool in ("spleeter", "transcription", "common"):
+    path = os.path.join(ROOT, tool)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import imageio_ffmpeg
+from audio_stream import AudioStreamReader, with_overlap
+from assembler import StreamingAssembler
+from exporters import MultiExporter, DEFAULT_FORMATS, parse_formats
+from audio_cache import SAMPLE_RATE
+from instrumentation import get_metrics, configure as configure_metrics
+
+CHUNK_MINUTES = 10
+CHUNK_OVERLAP_SEC = 2   # перекрытие для плавной склейки MP3 (как в spleeter/main.py)
+QUEUE_SIZE = 1          # кусков в очереди между этапами (память = этапы x очередь x кусок)
+MAX_CARRY_SEC = 30      # хвост без распознанной речи переносится в начало следующего куска
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.items = 0
+        self.media_sec = 0.0
+
+
+def _put(q, item, stop):
+    """Положить в очередь, но не висеть вечно, если соседний этап упал"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def resample_to_16k(ffmpeg_path, pcm, samplerate):
+    """[каналы, сэмплы] -> 16 кГц моно float32 (ресемплер ffmpeg, как при обычном декодировании)"""
+    cmd = [ffmpeg_path, "-v", "error", "-nostdin",
+           "-f", "f32le", "-ar", str(samplerate), "-ac", str(pcm.shape[0]), "-i", "pipe:0",
+           "-ar", str(SAMPLE_RATE), "-ac", "1", "-f", "f32le", "pipe:1"]
+    result = subprocess.run(cmd, input=np.ascontiguousarray(pcm.T).tobytes(), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+    return np.frombuffer(result.stdout, dtype="<f4")
+
+
+class Pipeline:
+    """separator — объект с separate_array(pcm), samplerate, audio_channels (DemucsSeparator);
+    transcriber — объект с transcribe_array(audio16k) (AudioTranscriber)"""
+
+    def __init__(self, separator, transcriber, chunk_sec=CHUNK_MINUTES * 60, overlap_sec=CHUNK_OVERLAP_SEC,
+                 queue_size=QUEUE_SIZE, formats=DEFAULT_FORMATS, ffmpeg_path=None):
+        self.separator = separator
+        self.transcriber = transcriber
+        self.chunk_sec = chunk_sec
+        self.overlap_sec = overlap_sec
+        self.queue_size = queue_size
+        self.formats = formats
+        self.ffmpeg_path = ffmpeg_path or imageio_ffmpeg.get_ffmpeg_exe()
+
+    # --- ЭТАПЫ ---
+    def _decode(self, video_path, out_q, stop, stats):
+        samplerate, channels = self.separator.samplerate, self.separator.audio_channels
+        reader = AudioStreamReader(self.ffmpeg_path, video_path, samplerate=samplerate, channels=channels,
+                                   block_seconds=self.chunk_sec)
+        metrics = get_metrics()
+        started = time.perf_counter()
+        for index, pcm in enumerate(with_overlap(reader, int(self.overlap_sec * samplerate))):
+            if pcm.shape[1] == 0:
+                break
+            stats.busy += time.perf_counter() - started
+            stats.items += 1
+            metrics.observe("decode_seconds", time.perf_counter() - started, component="pipeline")
+            if not _put(out_q, (index, pcm), stop):
+                reader.close()
+                return
+            metrics.gauge("queue_depth", out_q.qsize(), queue="decode")
+            started = time.perf_counter()
+
+    def _separate(self, in_q, out_q, stop, stats):
+        metrics = get_metrics()
+        while True:
+            item = _get(in_q, stop)
+            if item is _DONE:
+                return
+            index, pcm = item
+            started = time.perf_counter()
+            vocals = self.separator.separate_array(pcm)
+            stats.busy += time.perf_counter() - started
+            stats.items += 1
+            metrics.observe("separation_chunk_seconds", time.perf_counter() - started, component="pipeline")
+            print(f"   🎵 Кусок {index + 1}: голос отделен ({time.perf_counter() - started:.1f} сек)")
+            if not _put(out_q, (index, vocals), stop):
+                return
+            metrics.gauge("queue_depth", out_q.qsize(), queue="separate")
+
+    def _transcribe(self, in_q, stop, stats, assembler, exporter):
+        metrics = get_metrics()
+        samplerate = self.separator.samplerate
+        chunk_samples = int(self.chunk_sec * samplerate)
+        carry = np.zeros(0, dtype=np.float32)
+        last_end = 0.0
+
+        def handle(index, vocals):
+            nonlocal carry, last_end
+            started = time.perf_counter()
+            # Последний ли кусок, заранее не известно: хвост перекрытия придерживается,
+            # а в конце потока его дописывает assembler.finish()
+            assembler.add_pcm(vocals)
+
+            # Перекрытие нужно только для склейки; распознаем основную часть + непройденный хвост прошлого.
+            # У последнего куска перекрытия нет, он и так не длиннее chunk_samples
+            core = vocals[:, :chunk_samples]
+            stats.media_sec += core.shape[1] / samplerate
+            audio = np.concatenate([carry, resample_to_16k(self.ffmpeg_path, core, samplerate)])
+            offset = index * self.chunk_sec - len(carry) / SAMPLE_RATE
+            chunk_end = 0.0
+            segments = self.transcriber.transcribe_array(audio)
+            for segment in metrics.timed_iter(segments, "asr_segment_latency", component="pipeline"):
+                start, end = segment.start + offset, segment.end + offset
+                chunk_end = segment.end
+                if end <= last_end + 0.1:
+                    continue  # защита от дублей на стыке
+                exporter.write({"start": round(start, 2), "end": round(end, 2), "text": segment.text.strip()})
+                last_end = end
+
+            # Речь после последнего сегмента (оборванная фраза) уходит в следующий кусок
+            tail = audio[int(chunk_end * SAMPLE_RATE):]
+            carry = tail[-MAX_CARRY_SEC * SAMPLE_RATE:].astype(np.float32)
+            stats.busy += time.perf_counter() - started
+            stats.items += 1
+            print(f"   🎤 Кусок {index + 1}: распознан, сегментов всего: {exporter.count} "
+                  f"({time.perf_counter() - started:.1f} сек)")
+
+        while True:
+            item = _get(in_q, stop)
+            if item is _DONE:
+                break
+            handle(*item)
+        if not stop.is_set():
+            assembler.finish()
+
+    # --- ЗАПУСК ---
+    def run(self, video_path, output_base=None):
+        """Один видеофайл -> <base>_CLEAN.mp3 + <base>_CLEAN.srt/.txt (имена как у отдельных инструментов)"""
+        output_base = output_base or os.path.splitext(video_path)[0] + "_CLEAN"
+        print(f"--- 🚀 КОНВЕЙЕР: {os.path.basename(video_path)} ---")
+
+        decode_q = queue.Queue(maxsize=self.queue_size)
+        separate_q = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        stats = [StageStats("декодирование"), StageStats("разделение"), StageStats("распознавание")]
+
+        assembler = StreamingAssembler(self.ffmpeg_path, output_base + ".mp3", self.separator.samplerate,
+                                       self.separator.audio_channels, overlap_sec=self.overlap_sec)
+        exporter = MultiExporter(output_base, self.formats)
+
+        def stage(target, *args, out_q=None):
+            def body():
+                try:
+                    target(*args)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+                finally:
+                    if out_q is not None:
+                        _put(out_q, _DONE, stop)
+            thread = threading.Thread(target=body, daemon=True)
+            thread.start()
+            return thread
+
+        started = time.perf_counter()
+        threads = [
+            stage(self._decode, video_path, decode_q, stop, stats[0], out_q=decode_q),
+            stage(self._separate, decode_q, separate_q, stop, stats[1], out_q=separate_q),
+            stage(self._transcribe, separate_q, stop, stats[2], assembler, exporter),
+        ]
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            errors.append(KeyboardInterrupt())
+
+        if errors:
+            assembler.abort()
+            exporter.abort()
+            raise errors[0]
+        assembler.close()
+        outputs = exporter.finish()
+
+        wall = time.perf_counter() - started
+        metrics = get_metrics()
+        if stats[2].media_sec:
+            metrics.gauge("rtf", wall / stats[2].media_sec, component="pipeline")
+        for s in stats:
+            metrics.event("stage_done", component="pipeline", stage=s.name, busy=round(s.busy, 2), items=s.items)
+        print(f"\n--- 📊 ЭТАПЫ (стена: {wall:.1f} сек) ---")
+        for s in stats:
+            print(f"   {s.name:>14}: {s.busy:.1f} сек работы, кусков: {s.items}, загрузка {s.busy / wall * 100:.0f}%")
+        print(f"   ⚡ Скорость: x{stats[2].media_sec / wall:.1f} реального времени ({stats[2].media_sec / 60:.1f} мин)")
+        print(f"\n✅ Готово: {os.path.basename(output_base)}.mp3, " +
+              ", ".join(os.path.basename(p) for p in outputs.values()))
+        return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Конвейер: видео -> чистый голос -> субтитры (этапы параллельно)")
+    parser.add_argument("videos", nargs="+", help="Видеофайлы")
+    parser.add_argument("--model", default="large-v3", help="Модель Whisper")
+    parser.add_argument("--device", default="auto", help="Устройство (cuda, cpu, auto)")
+    parser.add_argument("--chunk-min", type=float, default=CHUNK_MINUTES, help="Длина куска (мин)")
+    parser.add_argument("--overlap", type=float, default=CHUNK_OVERLAP_SEC, help="Перекрытие кусков для склейки (сек)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Кусков в очереди между этапами")
+    parser.add_argument("--formats", type=parse_formats, default=DEFAULT_FORMATS, help="Форматы субтитров: srt,vtt,txt,json")
+    parser.add_argument("--metrics-jsonl", default=None, help="Писать события (JSON lines) в этот файл")
+    parser.add_argument("--metrics-prom", default=None, help="Файл метрик для Prometheus (textfile-коллектор node_exporter)")
+    args = parser.parse_args()
+    metrics = configure_metrics(args.metrics_jsonl, args.metrics_prom)
+
+    from separator import get_separator
+    from speechToText import AudioTranscriber
+    with metrics.timer("model_load", component="demucs"):
+        separator = get_separator(device=args.device)
+    pipeline = Pipeline(separator, AudioTranscriber(args.model, device=args.device),
+                        chunk_sec=args.chunk_min * 60, overlap_sec=args.overlap,
+                        queue_size=args.queue_size, formats=args.formats)
+    for video in args.videos:
+        try:
+            pipeline.run(video)
+        except KeyboardInterrupt:
+            print(f"\n⏸️  ОСТАНОВЛЕНО ПОЛЬЗОВАТЕЛЕМ")
+            sys.exit(0)
+        except Exception as e:
+            print(f"❌ Ошибка ({video}): {e}")
+
+
+if __name__ == "__main__":
+    main()
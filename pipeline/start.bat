@@ -0,0 +1,9 @@
+@echo off
+chcp 65001 > nul
+
+:: Конвейер: видео -> чистый голос -> субтитры (этапы работают одновременно)
+:: Пример: start.bat lecture.mp4
+python pipeline.py %*
+
+echo.
+pause
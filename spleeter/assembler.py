@@ -0,0 +1,152 @@
+import os
+import subprocess
+import wave
+
+import numpy as np
+
+from audio_stream import to_int16
+from pcm16k import Pcm16kWriter, SAMPLE_RATE as PCM16K_RATE
+
+# --- ПОТОКОВАЯ СКЛЕЙКА В MP3 ---
+# Куски читаются блоками и сразу уходят в stdin одного процесса ffmpeg.
+# В памяти держим только текущий блок и хвост перекрытия, а не весь файл.
+
+BLOCK_FRAMES = 44100 * 10  # ~10 сек звука за одну запись в pipe
+
+
+def _to_frames(data: bytes, channels: int) -> np.ndarray:
+    return np.frombuffer(data, dtype="<i2").reshape(-1, channels)
+
+
+def _crossfade(tail: np.ndarray, head: np.ndarray) -> np.ndarray:
+    """Линейный переход: хвост предыдущего куска затухает, начало следующего нарастает"""
+    ramp = np.linspace(0.0, 1.0, len(head), endpoint=False, dtype=np.float32)[:, None]
+    mixed = tail.astype(np.float32) * (1.0 - ramp) + head.astype(np.float32) * ramp
+    return np.clip(np.rint(mixed), -32768, 32767).astype("<i2")
+
+
+class StreamingAssembler:
+    """Склеивает *_clean.wav по порядку (с перекрытием) прямо в кодировщик ffmpeg.
+
+    pcm16k_path — тем же процессом ffmpeg писать еще и 16 кГц моно для транскрипции (*.pcm16k).
+    """
+
+    def __init__(self, ffmpeg_path: str, output_path: str, samplerate: int, channels: int,
+                 overlap_sec: float = 0.0, bitrate: str = "128k", pcm16k_path: str = None):
+        self.output_path = output_path
+        self.temp_output = output_path + ".part"
+        self.samplerate = samplerate
+        self.channels = channels
+        self.overlap = int(overlap_sec * samplerate)
+        self.held = None  # хвост предыдущего куска, ждущий смешивания со следующим
+
+        cmd = [
+            ffmpeg_path, "-v", "error", "-nostdin", "-y",
+            "-f", "s16le", "-ar", str(samplerate), "-ac", str(channels), "-i", "pipe:0",
+            "-map", "0:a", "-b:a", bitrate, "-f", "mp3", self.temp_output
+        ]
+        # Второй выход того же ffmpeg: склейка ресемплится один раз, без MP3 посередине
+        self.pcm16k = Pcm16kWriter(pcm16k_path) if pcm16k_path else None
+        if self.pcm16k:
+            cmd += ["-map", "0:a", "-ar", str(PCM16K_RATE), "-ac", "1", "-f", "f32le", "pipe:1"]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        stdout=subprocess.PIPE if self.pcm16k else None)
+        if self.pcm16k:
+            self.pcm16k.start(self.process.stdout)
+
+    def _write(self, frames: np.ndarray):
+        if len(frames):
+            self.process.stdin.write(np.ascontiguousarray(frames).tobytes())
+
+    def _add(self, read, total: int, last: bool):
+        """read(n) -> следующие n кадров int16 [сэмплы, каналы]"""
+        pos = 0
+
+        # Общий участок с предыдущим куском — плавный переход
+        if self.held is not None and len(self.held):
+            k = min(len(self.held), total)
+            head = read(k)
+            self._write(self.held[:len(self.held) - k])
+            self._write(_crossfade(self.held[len(self.held) - k:], head))
+            pos = k
+        self.held = None
+
+        # Середину пишем блоками; хвост последних overlap сэмплов придерживаем
+        hold = 0 if last else min(self.overlap, total - pos)
+        stream_end = total - hold
+        while pos < stream_end:
+            n = min(BLOCK_FRAMES, stream_end - pos)
+            self._write(read(n))
+            pos += n
+
+        if hold:
+            self.held = read(hold).copy()
+
+    def add_wav(self, path: str, last: bool = False):
+        with wave.open(path, "rb") as wf:
+            if wf.getframerate() != self.samplerate or wf.getnchannels() != self.channels:
+                raise ValueError(f"Формат {os.path.basename(path)} не совпадает с остальными кусками")
+            self._add(lambda n: _to_frames(wf.readframes(n), self.channels), wf.getnframes(), last)
+
+    def add_pcm(self, pcm: np.ndarray, last: bool = False):
+        """Кусок прямо из памяти ([каналы, сэмплы] float32) — без *_clean.wav на диске"""
+        if pcm.shape[0] != self.channels:
+            raise ValueError(f"Ожидалось каналов: {self.channels}, пришло: {pcm.shape[0]}")
+        frames = np.ascontiguousarray(to_int16(pcm).T)
+        pos = [0]
+
+        def read(n):
+            chunk = frames[pos[0]:pos[0] + n]
+            pos[0] += n
+            return chunk
+
+        self._add(read, len(frames), last)
+
+    def finish(self):
+        """Конец потока: кусков больше не будет — придержанный хвост последнего дописывается как есть.
+        Нужен, когда заранее неизвестно, какой кусок последний (конвейер)"""
+        if self.held is not None:
+            self._write(self.held)
+            self.held = None
+
+    def close(self):
+        """Дописывает остаток, дожидается ffmpeg и атомарно кладет готовый MP3 (и *.pcm16k)"""
+        self.finish()
+        self.process.stdin.close()
+        err = self.process.stderr.read().decode("utf-8", errors="ignore")
+        if self.process.wait() != 0:
+            if self.pcm16k:
+                self.pcm16k.abort()
+            raise RuntimeError(f"ffmpeg завершился с кодом {self.process.returncode}: {err.strip()}")
+        os.replace(self.temp_output, self.output_path)
+        if self.pcm16k:
+            self.pcm16k.finish(source_path=self.output_path)  # привязка к MP3: его замена = устаревание
+
+    def abort(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if self.pcm16k:
+            self.pcm16k.abort()
+        if os.path.exists(self.temp_output):
+            try:
+                os.remove(self.temp_output)
+            except OSError:
+                pass
+
+
+def assemble_mp3(ffmpeg_path: str, wav_paths, output_path: str, overlap_sec: float = 0.0,
+                 bitrate: str = "128k", pcm16k_path: str = None):
+    """Склеивает куски в один MP3; память ограничена одним блоком, а не длиной видео"""
+    with wave.open(wav_paths[0], "rb") as wf:
+        samplerate, channels = wf.getframerate(), wf.getnchannels()
+
+    assembler = StreamingAssembler(ffmpeg_path, output_path, samplerate, channels,
+                                   overlap_sec=overlap_sec, bitrate=bitrate, pcm16k_path=pcm16k_path)
+    try:
+        for i, path in enumerate(wav_paths):
+            assembler.add_wav(path, last=(i == len(wav_paths) - 1))
+        assembler.close()
+    except BaseException:
+        assembler.abort()
+        raise
@@ -0,0 +1,109 @@
+import subprocess
+import wave
+
+import numpy as np
+
+# --- ПОТОКОВОЕ ЧТЕНИЕ ЗВУКА ИЗ ВИДЕО ---
+# Один проход ffmpeg по контейнеру: звук идет через pipe блоками фиксированной длины,
+# без промежуточных part_N.wav на диске.
+
+SAMPLE_BYTES = 4  # float32
+
+
+class AudioStreamReader:
+    """Итератор по блокам PCM: каждый блок — numpy float32 формы [каналы, сэмплы]"""
+
+    def __init__(self, ffmpeg_path: str, input_path: str, samplerate: int, channels: int,
+                 block_seconds: float, start_sec: float = 0.0):
+        self.ffmpeg_path = ffmpeg_path
+        self.input_path = input_path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.block_samples = int(block_seconds * samplerate)
+        self.start_sec = start_sec
+        self.process = None
+
+    def _command(self):
+        cmd = [self.ffmpeg_path, "-v", "error", "-nostdin"]
+        if self.start_sec > 0:
+            cmd += ["-ss", str(self.start_sec)]
+        cmd += [
+            "-i", self.input_path, "-vn",
+            "-ac", str(self.channels), "-ar", str(self.samplerate),
+            "-f", "f32le", "pipe:1"
+        ]
+        return cmd
+
+    def _read_exact(self, size):
+        """Читает ровно size байт (или меньше, если поток закончился)"""
+        buf = bytearray(size)
+        view = memoryview(buf)
+        filled = 0
+        while filled < size:
+            n = self.process.stdout.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        return buf[:filled] if filled < size else buf
+
+    def __iter__(self):
+        block_bytes = self.block_samples * self.channels * SAMPLE_BYTES
+        self.process = subprocess.Popen(self._command(), stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, bufsize=0)
+        try:
+            while True:
+                data = self._read_exact(block_bytes)
+                if not data:
+                    break
+                # Обрезаем хвост до целого числа кадров
+                usable = len(data) - len(data) % (self.channels * SAMPLE_BYTES)
+                pcm = np.frombuffer(data[:usable], dtype="<f4").reshape(-1, self.channels)
+                yield np.ascontiguousarray(pcm.T)
+                if len(data) < block_bytes:
+                    break
+        finally:
+            self.close()
+
+        if self.process.returncode not in (0, None):
+            err = self.process.stderr.read().decode("utf-8", errors="ignore") if self.process.stderr else ""
+            raise RuntimeError(f"ffmpeg завершился с кодом {self.process.returncode}: {err.strip()}")
+
+    def close(self):
+        if self.process and self.process.poll() is None:
+            self.process.stdout.close()
+            self.process.kill()
+            self.process.wait()
+        elif self.process:
+            self.process.wait()
+
+
+def to_int16(pcm: np.ndarray) -> np.ndarray:
+    """[каналы, сэмплы] float32 -> int16 (как demucs с clip=rescale: громкий кусок приглушается)"""
+    peak = float(np.abs(pcm).max()) if pcm.size else 0.0
+    if peak > 1.0:
+        pcm = pcm / (1.01 * peak)
+    return (np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2")
+
+
+def write_wav(path: str, pcm: np.ndarray, samplerate: int):
+    """Сохраняет [каналы, сэмплы] float32 в 16-битный WAV (как demucs с clip=rescale)"""
+    samples = to_int16(pcm)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(pcm.shape[0])
+        wf.setsampwidth(2)
+        wf.setframerate(samplerate)
+        wf.writeframes(np.ascontiguousarray(samples.T).tobytes())
+
+
+def with_overlap(blocks, overlap_samples: int):
+    """Дописывает к каждому блоку начало следующего: [блок_i | первые overlap сэмплов блока_i+1]"""
+    prev = None
+    for block in blocks:
+        if prev is not None:
+            if overlap_samples > 0:
+                yield np.concatenate([prev, block[:, :overlap_samples]], axis=1)
+            else:
+                yield prev
+        prev = block
+    if prev is not None:
+        yield prev
@@ -0,0 +1,97 @@
+import os
+import glob
+import json
+import time
+import shutil
+import hashlib
+
+# --- ПАКЕТНЫЙ РЕЖИМ: МАНИФЕСТ ЗАДАНИЙ ---
+# Манифест (JSON) хранит состояние каждого файла и его рабочую папку.
+# После сбоя запуск продолжается с манифеста; готовые файлы пропускаются по нему,
+# без поиска *_CLEAN.mp3 на диске. Готовые куски файла — *_clean.wav в рабочей папке
+# (пишутся атомарно), по ним clean_voice_final_v2 и продолжает.
+# Рабочая папка привязана к содержимому видео (размер и mtime в имени): куски старой
+# версии файла в новый MP3 не попадут.
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+DEFAULT_MANIFEST = "spleeter_jobs.json"
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def collect_videos(patterns, sort_key=None):
+    """Папки (рекурсивно), маски (glob) и отдельные файлы -> список абсолютных путей"""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = []
+            for root, _, filenames in os.walk(pattern):
+                candidates += [os.path.join(root, f) for f in filenames]
+        elif os.path.isfile(pattern):
+            candidates = [pattern]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+
+        for path in candidates:
+            name = os.path.basename(path)
+            if name.lower().endswith(VIDEO_EXTENSIONS) and "_CLEAN" not in name:
+                found.append(os.path.abspath(path))
+
+    unique = sorted(set(found), key=sort_key)
+    return unique
+
+
+class JobManifest:
+    def __init__(self, path: str = DEFAULT_MANIFEST):
+        self.path = os.path.abspath(path)
+        self.jobs = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.jobs = json.load(f).get("jobs", {})
+
+    def save(self):
+        """Атомарная запись: манифест не бьется при падении посреди сохранения"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "jobs": self.jobs}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    def add(self, video_path: str, work_root: str):
+        """Регистрирует файл; задание сбрасывается, только если сам файл изменился"""
+        st = os.stat(video_path)
+        job = self.jobs.get(video_path)
+        if job and job["size"] == st.st_size and job["mtime"] == st.st_mtime:
+            if job["status"] == STATUS_RUNNING:
+                job["status"] = STATUS_PENDING  # прошлый запуск упал на этом файле
+            return job
+        if job:
+            # Куски прошлой версии файла больше не нужны
+            shutil.rmtree(job["work_dir"], ignore_errors=True)
+
+        base_name = os.path.splitext(os.path.basename(video_path))[0]
+        stamp = f"{video_path}|{st.st_size}|{st.st_mtime_ns}"
+        path_hash = hashlib.sha1(stamp.encode("utf-8")).hexdigest()[:8]
+        job = {
+            "status": STATUS_PENDING,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "work_dir": os.path.join(os.path.abspath(work_root), f"{base_name}_{path_hash}"),
+            "output": os.path.join(os.path.dirname(video_path), f"{base_name}_CLEAN.mp3"),
+            "error": None,
+            "updated": time.time(),
+        }
+        self.jobs[video_path] = job
+        return job
+
+    def set_status(self, video_path: str, status: str, error: str = None):
+        job = self.jobs[video_path]
+        job["status"] = status
+        job["error"] = error
+        job["updated"] = time.time()
+        self.save()
+
+    def pending(self, paths):
+        return [p for p in paths if self.jobs[p]["status"] != STATUS_DONE]
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+import numpy as np
+
+# --- ПРОВЕРКА ПАМЯТИ СКЛЕЙКИ: пик RSS не должен расти с длиной видео ---
+# assemble_mp3 гоняется на нескольких длительностях, каждая — в свежем процессе.
+# Куски — один и тот же синтетический *_clean.wav, повторенный N раз (на диске только он).
+# Код возврата 1, если пик памяти на самой длинной склейке заметно больше, чем на короткой.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMMON_DIR = os.path.join(os.path.dirname(HERE), "common")
+
+DEFAULT_MINUTES = "2,8,32"
+CHUNK_SEC = 60
+DEFAULT_MAX_GROWTH_MB = 20
+
+PROBE = """
+import sys, json, time
+sys.path[:0] = [%r, %r]
+import imageio_ffmpeg
+from assembler import assemble_mp3
+from instrumentation import peak_rss_bytes
+chunk, count, output = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+start = time.perf_counter()
+assemble_mp3(imageio_ffmpeg.get_ffmpeg_exe(), [chunk] * count, output, overlap_sec=2)
+print(json.dumps({"peak": peak_rss_bytes(), "sec": time.perf_counter() - start}))
+""" % (HERE, COMMON_DIR)
+
+
+def make_chunk(path, seconds=CHUNK_SEC, samplerate=44100):
+    from audio_stream import write_wav
+    t = np.arange(int(seconds * samplerate), dtype=np.float32) / samplerate
+    rng = np.random.default_rng(1)
+    voice = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    pcm = np.stack([voice + 0.01 * rng.standard_normal(len(t)).astype(np.float32) for _ in range(2)])
+    write_wav(path, pcm, samplerate)
+
+
+def measure(chunk, minutes, work_dir):
+    count = max(1, int(minutes * 60 // CHUNK_SEC))
+    output = os.path.join(work_dir, f"out_{minutes:g}.mp3")
+    result = subprocess.run([sys.executable, "-c", PROBE, chunk, str(count), output], cwd=HERE,
+                            capture_output=True, text=True, encoding="utf-8")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    os.remove(output)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка: память склейки MP3 не растет с длиной видео")
+    parser.add_argument("--minutes", default=DEFAULT_MINUTES, help="Длительности через запятую (мин)")
+    parser.add_argument("--max-growth-mb", type=float, default=DEFAULT_MAX_GROWTH_MB,
+                        help="Допустимый рост пика памяти от короткой склейки к длинной (МБ)")
+    args = parser.parse_args()
+    durations = sorted(float(m) for m in args.minutes.split(","))
+
+    print(f"--- 🧠 ПАМЯТЬ СКЛЕЙКИ: {', '.join(f'{m:g}' for m in durations)} мин ---")
+    work_dir = tempfile.mkdtemp(prefix="assembler_bench_")
+    try:
+        chunk = os.path.join(work_dir, "part_clean.wav")
+        make_chunk(chunk)
+        peaks = []
+        for minutes in durations:
+            r = measure(chunk, minutes, work_dir)
+            if r["peak"] is None:
+                print("   ❌ ОС не сообщает пик памяти (на Windows нужен psutil)")
+                sys.exit(1)
+            peaks.append(r["peak"] / 1024**2)
+            print(f"   📼 {minutes:>5g} мин: пик {peaks[-1]:.0f} МБ, {r['sec']:.1f} сек")
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+    growth = peaks[-1] - peaks[0]
+    failed = growth > args.max_growth_mb
+    print(f"\n   Рост: {growth:+.1f} МБ (лимит {args.max_growth_mb:g})")
+    print(f"   {'❌ ПАМЯТЬ РАСТЕТ С ДЛИНОЙ' if failed else '✅ Память не зависит от длины'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+# --- СРАВНЕНИЕ СКОРОСТИ: subprocess `python -m demucs` против модели в памяти ---
+
+
+def run_subprocess(chunk_audio, out_dir):
+    """Старый путь: новый процесс на каждый кусок (импорт torch + загрузка весов)"""
+    cmd = [
+        sys.executable, "-m", "demucs",
+        "-n", "htdemucs",
+        "--two-stems=vocals",
+        "--shifts=0", "-j", "0",
+        "-o", out_dir,
+        chunk_audio
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер: demucs через subprocess vs в процессе")
+    parser.add_argument("audio", help="WAV-файл (один кусок)")
+    parser.add_argument("--runs", type=int, default=3, help="Сколько кусков имитировать")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="demucs_bench_")
+    try:
+        print(f"--- ⏱ ЗАМЕР НА {args.runs} КУСКАХ: {os.path.basename(args.audio)} ---")
+
+        start = time.perf_counter()
+        for i in range(args.runs):
+            run_subprocess(args.audio, os.path.join(work_dir, f"sub_{i}"))
+        subprocess_time = time.perf_counter() - start
+        print(f"   🐢 subprocess:  {subprocess_time:.1f} сек ({subprocess_time / args.runs:.1f} сек/кусок)")
+
+        start = time.perf_counter()
+        from separator import DemucsSeparator  # импорт torch тоже входит в замер
+        separator = DemucsSeparator()
+        load_time = time.perf_counter() - start
+        for i in range(args.runs):
+            separator.separate_file(args.audio, os.path.join(work_dir, f"inproc_{i}.wav"))
+        inproc_time = time.perf_counter() - start
+        print(f"   🚀 в процессе:  {inproc_time:.1f} сек (из них загрузка {load_time:.1f} сек)")
+
+        print(f"\n   ⚡ Ускорение: x{subprocess_time / inproc_time:.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
 import os
 import sys
-import subprocess
 import shutil
+import argparse
 import re  # Добавили модуль для умной сортировки
-from moviepy import VideoFileClip
-from pydub import AudioSegment
+import json
+import time
+
+# Общие модули (common/ рядом со всеми инструментами): измерения и формат *.pcm16k.
+# Путь добавляется до своих импортов — audio_cache/pcm16k берут формат оттуда
+COMMON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common")
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
 import imageio_ffmpeg
+from separator import get_separator, separation_settings
+from audio_stream import AudioStreamReader, with_overlap
+from parallel import SeparationPool, separate_chunk_to_wav
+from assembler import assemble_mp3
+from pcm16k import PCM16K_EXT
+from stem_cache import StemCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_GB
+import batch
+from instrumentation import get_metrics, configure as configure_metrics
+
+CHUNK_OVERLAP_SEC = 2  # Перекрытие соседних кусков (сек) для плавной склейки
+WORK_STATE_FILE = "chunks.json"  # с какими настройками нарезаны *_clean.wav в рабочей папке
 
 # --- ФУНКЦИЯ УМНОЙ СОРТИРОВКИ ---
 def smart_sort_key(filename):
@@ -51,15 +68,51 @@ def auto_find_video():
         except ValueError:
             print("❌ Это не число. Попробуйте еще раз.")
 
+# --- НАСТРОЙКИ НАРЕЗКИ В РАБОЧЕЙ ПАПКЕ ---
+def load_work_state(work_dir):
+    try:
+        with open(os.path.join(work_dir, WORK_STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_work_state(work_dir, state):
+    path = os.path.join(work_dir, WORK_STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def prepare_work_dir(work_dir, cut):
+    """Готовые куски годятся, только если нарезаны так же (перекрытие, длина, частота):
+    иначе склейка смешает не тот отрезок. Чужие куски удаляются и режутся заново"""
+    state = load_work_state(work_dir)
+    if {k: state.get(k) for k in cut} != cut:
+        stale = [f for f in os.listdir(work_dir) if f.endswith("_clean.wav")]
+        if stale:
+            print(f"   ⚠️  Куски в {work_dir} нарезаны с другими настройками "
+                  f"({', '.join(f'{k}={state.get(k)}' for k in cut)}) — режем заново")
+        for name in stale:
+            os.remove(os.path.join(work_dir, name))
+        state = {}  # и число кусков (total_chunks) — тоже от старой нарезки
+    state.update(cut)
+    save_work_state(work_dir, state)
+    return state
+
 # --------------------------------
 
-def clean_voice_final_v2(video_filename):
+def clean_voice_final_v2(video_filename, workers=1, overlap_sec=CHUNK_OVERLAP_SEC, stem_cache=None,
+                         work_dir="temp_work_folder", output_dir=None, pool=None, pcm16k=False):
+    """Чистит голос в видео. True — если итоговый MP3 сохранен.
+
+    pool — общий SeparationPool (пакетный режим: модели грузятся один раз на весь запуск),
+    pcm16k — рядом с MP3 положить *_CLEAN.pcm16k (16 кГц моно без потерь, для транскрипции).
+    """
     if not video_filename:
-        return
+        return False
 
     print(f"--- 🚀 НАЧИНАЕМ ОБРАБОТКУ: {video_filename} ---")
-    
-    AudioSegment.converter = imageio_ffmpeg.get_ffmpeg_exe()
+    metrics = get_metrics()
+    started = time.perf_counter()
     
     if os.path.exists("separated"):
         try:
@@ -69,14 +122,17 @@ def clean_voice_final_v2(video_filename):
 
     base_name = os.path.splitext(os.path.basename(video_filename))[0]
     final_output = f"{base_name}_CLEAN.mp3"
+    if output_dir:
+        final_output = os.path.join(output_dir, final_output)
+    pcm16k_output = os.path.splitext(final_output)[0] + PCM16K_EXT if pcm16k else None
     
     CHUNK_MINUTES = 10 
     chunk_length_sec = CHUNK_MINUTES * 60
-    work_dir = "temp_work_folder"
     
     if not os.path.exists(work_dir):
         os.makedirs(work_dir)
 
+    from moviepy import VideoFileClip  # тяжелый импорт — только когда есть что обрабатывать
     try:
         with VideoFileClip(video_filename) as video:
             duration = video.duration
@@ -84,82 +140,150 @@ def clean_voice_final_v2(video_filename):
             total_chunks = int(duration // chunk_length_sec) + 1
     except Exception as e:
         print(f"❌ Ошибка открытия видео: {e}")
-        return
+        return False
 
-    processed_files = []
+    own_pool = pool is None and workers > 1
+    try:
+        if own_pool:
+            print(f"🧵 Параллельный режим: {workers} процессов")
+            pool = SeparationPool(workers)
+        with metrics.timer("model_load", component="demucs"):
+            if pool:
+                samplerate, channels = pool.model_format()
+            else:
+                separator = get_separator()
+                samplerate, channels = separator.samplerate, separator.audio_channels
+    except Exception as e:
+        print(f"❌ Не удалось загрузить нейросеть: {e}")
+        if own_pool and pool:
+            pool.shutdown()
+        return False
 
-    for i in range(total_chunks):
-        start_t = i * chunk_length_sec
-        end_t = min((i + 1) * chunk_length_sec, duration)
-        
-        if start_t >= duration:
-            break
-            
-        chunk_name = f"part_{i}"
-        chunk_audio = os.path.join(work_dir, f"{chunk_name}.wav")
-        chunk_clean = os.path.join(work_dir, f"{chunk_name}_clean.wav")
-        
-        print(f"\n🔹 [Часть {i+1} из {total_chunks}] {start_t:.0f}-{end_t:.0f} сек...")
+    try:
+        state = prepare_work_dir(work_dir, {"overlap_sec": overlap_sec, "chunk_sec": chunk_length_sec,
+                                            "samplerate": samplerate})
+    except OSError as e:
+        print(f"❌ Рабочая папка недоступна: {e}")
+        if own_pool and pool:
+            pool.shutdown()
+        return False
 
-        if os.path.exists(chunk_clean):
-            processed_files.append(chunk_clean)
-            print("   ↳ ✅ УЖЕ ОБРАБОТАНО (пропускаем)")
-            continue
+    def chunk_path(index):
+        return os.path.join(work_dir, f"part_{index}_clean.wav")
 
-        try:
-            with VideoFileClip(video_filename) as video:
-                sub = video.subclipped(start_t, end_t) 
-                sub.audio.write_audiofile(chunk_audio, logger=None)
-        except Exception as e:
-            print(f"❌ Ошибка нарезки: {e}")
-            return
-
-        print("   ⏳ Нейросеть чистит голос... (подождите)")
-        
-        cmd = [
-            sys.executable, "-m", "demucs", 
-            "-n", "htdemucs", 
-            "--two-stems=vocals",
-            "--shifts=0", "-j", "0",
-            chunk_audio
-        ]
-        
-        try:
-            subprocess.run(cmd, check=True, capture_output=True) 
-        except subprocess.CalledProcessError as e:
-            print("❌ Сбой нейросети.")
-            try:
-                print(e.stderr.decode('utf-8', errors='ignore'))
-            except:
-                print(e.stderr)
-            return
-        except Exception as ex:
-             print(f"❌ Общая ошибка запуска: {ex}")
-             return
-
-        demucs_out = os.path.join("separated", "htdemucs", chunk_name, "vocals.wav")
-        if os.path.exists(demucs_out):
-            shutil.move(demucs_out, chunk_clean)
-            processed_files.append(chunk_clean)
-            print("   ✅ Кусок готов")
-            
-            try:
-                shutil.rmtree("separated") 
-                os.remove(chunk_audio)
-            except:
-                pass
-        else:
-            print("⚠️ Ошибка: файл не обработался.")
-            return
+    # Сколько кусков на самом деле, знает только декодер: звуковая дорожка бывает короче
+    # контейнера. Число запоминается в chunks.json, когда поток дочитан до конца
+    decoded_chunks = state.get("total_chunks")
+    if decoded_chunks is not None:
+        total_chunks = decoded_chunks
+
+    # Уже готовые куски в начале пропускаем без декодирования: ffmpeg стартует с первого недоделанного
+    first_todo = 0
+    while (decoded_chunks is None or first_todo < decoded_chunks) and os.path.exists(chunk_path(first_todo)):
+        first_todo += 1
+
+    if first_todo:
+        print(f"\n   ↳ ✅ Частей уже обработано: {first_todo} (пропускаем)")
+
+    settings = separation_settings()
+    cache_keys = {}
+    submitted = {}  # когда кусок ушел в пул — время разделения с учетом ожидания в очереди
+
+    def report_done(done):
+        for index, path in done:
+            print(f"   ✅ Кусок {index+1} готов")
+            if index in submitted:
+                metrics.observe("separation_chunk_seconds", time.perf_counter() - submitted.pop(index),
+                                component="demucs", mode="pool")
+            if stem_cache:
+                key = cache_keys.pop(index, None)
+                if key:
+                    stem_cache.put(key, path)
+
+    try:
+        if decoded_chunks is None or first_todo < decoded_chunks:
+            reader = AudioStreamReader(
+                imageio_ffmpeg.get_ffmpeg_exe(), video_filename,
+                samplerate=samplerate, channels=channels,
+                block_seconds=chunk_length_sec, start_sec=first_todo * chunk_length_sec
+            )
+            # Каждый кусок захватывает overlap_sec следующего — на склейке они плавно смешиваются
+            windows = with_overlap(reader, int(overlap_sec * samplerate))
+            windows = metrics.timed_iter(windows, "decode", component="separation")
+
+            # Один проход ffmpeg: каждый блок PCM сразу идет в нейросеть, без part_N.wav
+            decoded_chunks = first_todo
+            for i, pcm in enumerate(windows, start=first_todo):
+                if pcm.shape[1] == 0:
+                    break
+                decoded_chunks = i + 1
+
+                start_t = i * chunk_length_sec
+                end_t = min(start_t + pcm.shape[1] / samplerate, duration)
+                chunk_clean = chunk_path(i)
+
+                print(f"\n🔹 [Часть {i+1} из {total_chunks}] {start_t:.0f}-{end_t:.0f} сек...")
+
+                if os.path.exists(chunk_clean):
+                    print("   ↳ ✅ УЖЕ ОБРАБОТАНО (пропускаем)")
+                    continue
+
+                if stem_cache:
+                    # Тот же звук уже чистили (в другом запуске или другом файле)
+                    cache_keys[i] = stem_cache.key(pcm, settings)
+                    if stem_cache.get(cache_keys[i], chunk_clean):
+                        del cache_keys[i]
+                        print("   ↳ ♻️  Взято из кэша")
+                        continue
+
+                if pool:
+                    print("   📤 Отправлено в очередь нейросети")
+                    submitted[i] = time.perf_counter()
+                    done = pool.submit(i, pcm, chunk_clean)
+                    metrics.gauge("queue_depth", len(pool.pending), queue="separation_pool")
+                    report_done(done)
+                else:
+                    print("   ⏳ Нейросеть чистит голос... (подождите)")
+                    # Модель уже в памяти: грузится один раз на весь запуск
+                    with metrics.timer("separation_chunk", component="demucs", mode="serial"):
+                        separate_chunk_to_wav(pcm, chunk_clean)
+                    report_done([(i, chunk_clean)])
+
+            if pool:
+                print("\n   ⏳ Ждем оставшиеся куски...")
+                report_done(pool.drain())
+            state["total_chunks"] = decoded_chunks
+            save_work_state(work_dir, state)
+    except Exception as e:
+        print(f"❌ Сбой нейросети: {e}")
+        if pool:
+            pool.reset()  # общий пул пакетного режима переходит к следующему файлу чистым
+        return False
+    finally:
+        if own_pool and pool:
+            pool.shutdown()
+
+    chunk_cleans = [chunk_path(i) for i in range(decoded_chunks)]
+    if not chunk_cleans:
+        print("❌ В видео нет звука.")
+        return False
+    processed_files = [f for f in chunk_cleans if os.path.exists(f)]
+    if len(processed_files) < len(chunk_cleans):
+        print("⚠️ Ошибка: обработаны не все части.")
+        return False
 
     print(f"\n🔗 Склеиваем всё в один файл...")
     try:
-        combined = AudioSegment.empty()
-        for f in processed_files:
-            combined += AudioSegment.from_wav(f)
-        
-        print("💾 Сохраняем MP3 (128kbps)...")
-        combined.export(final_output, format="mp3", bitrate="128k")
+        # Куски по очереди идут в один кодировщик ffmpeg: в памяти только текущий блок
+        print("💾 Сохраняем MP3 (128kbps)" + (" + PCM 16 кГц для транскрипции..." if pcm16k else "..."))
+        with metrics.timer("assemble", component="separation"):
+            assemble_mp3(imageio_ffmpeg.get_ffmpeg_exe(), processed_files, final_output,
+                         overlap_sec=overlap_sec, bitrate="128k", pcm16k_path=pcm16k_output)
+        if duration:
+            metrics.gauge("rtf", (time.perf_counter() - started) / duration, component="separation")
+        metrics.event("file_done", component="separation", file=os.path.basename(video_filename),
+                      chunks=len(processed_files), audio_sec=round(duration, 2),
+                      elapsed=round(time.perf_counter() - started, 2))
         
         try:
             shutil.rmtree(work_dir)
@@ -169,17 +293,82 @@ def clean_voice_final_v2(video_filename):
         print("\n" + "="*50)
         print("✅ АУДИО ОЧИЩЕНО!")
         print(f"📁 Файл сохранен как: {final_output}")
+        if pcm16k_output:
+            print(f"🎤 Для транскрипции: {pcm16k_output} (без декодирования MP3)")
         print("="*50)
         print("\n💡 Для транскрипции запустите: transcription/speechToText.py")
         print("   (поддерживает возобновление с места остановки)")
+        return True
 
     except Exception as e:
         print(f"❌ Ошибка при сохранении: {e}")
+        return False
+
+# --- ПАКЕТНЫЙ РЕЖИМ (без вопросов, для сервера) ---
+def run_batch(patterns, manifest_path=batch.DEFAULT_MANIFEST, workers=1,
+              overlap_sec=CHUNK_OVERLAP_SEC, stem_cache=None, pcm16k=False):
+    manifest = batch.JobManifest(manifest_path)
+    videos = batch.collect_videos(patterns, sort_key=lambda p: smart_sort_key(os.path.basename(p)))
+    for path in videos:
+        manifest.add(path, "temp_work_folder")
+    manifest.save()
+
+    todo = manifest.pending(videos)
+    print(f"--- 📦 ПАКЕТНЫЙ РЕЖИМ: {len(videos)} видео, к обработке {len(todo)} ---")
+    print(f"📝 Манифест: {manifest.path}")
+
+    # Один пул на весь запуск: модели в процессах грузятся один раз, а не на каждый файл
+    pool = SeparationPool(workers) if workers > 1 and todo else None
+    try:
+        for n, path in enumerate(todo, 1):
+            job = manifest.jobs[path]
+            print(f"\n📄 [{n}/{len(todo)}] {path}")
+            manifest.set_status(path, batch.STATUS_RUNNING)
+            try:
+                ok = clean_voice_final_v2(
+                    path, workers=workers, overlap_sec=overlap_sec, stem_cache=stem_cache,
+                    work_dir=job["work_dir"], output_dir=os.path.dirname(path), pool=pool, pcm16k=pcm16k
+                )
+                error = None if ok else "обработка прервана (см. лог)"
+            except Exception as e:
+                ok, error = False, str(e)
+                print(f"❌ Ошибка: {e}")
+            manifest.set_status(path, batch.STATUS_DONE if ok else batch.STATUS_FAILED, error)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    statuses = [manifest.jobs[p]["status"] for p in videos]
+    print("\n" + "="*50)
+    print(f"🏁 Готово: {statuses.count(batch.STATUS_DONE)} | ❌ Ошибок: {statuses.count(batch.STATUS_FAILED)}")
+    print("="*50)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Очистка голоса из видео (Demucs)")
+    parser.add_argument("--workers", type=int, default=1, help="Сколько кусков чистить параллельно (процессов)")
+    parser.add_argument("--overlap", type=float, default=CHUNK_OVERLAP_SEC, help="Перекрытие кусков для плавной склейки (сек)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Папка кэша очищенных кусков")
+    parser.add_argument("--cache-size-gb", type=float, default=DEFAULT_CACHE_SIZE_GB, help="Лимит кэша (ГБ)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш")
+    parser.add_argument("--batch", nargs="+", metavar="PATH", help="Пакетный режим: папки, маски (glob) или файлы")
+    parser.add_argument("--manifest", default=batch.DEFAULT_MANIFEST, help="Файл манифеста заданий (пакетный режим)")
+    parser.add_argument("--pcm16k", action="store_true", help="Также сохранить *_CLEAN.pcm16k (16 кГц моно) для транскрипции")
+    parser.add_argument("--metrics-jsonl", default=None, help="Писать события (JSON lines) в этот файл")
+    parser.add_argument("--metrics-prom", default=None, help="Файл метрик для Prometheus (textfile-коллектор node_exporter)")
+    args = parser.parse_args()
+    configure_metrics(args.metrics_jsonl, args.metrics_prom)
+
+    cache = None if args.no_cache else StemCache(args.cache_dir, int(args.cache_size_gb * 1024**3))
+
+    if args.batch:
+        run_batch(args.batch, args.manifest, workers=args.workers, overlap_sec=args.overlap, stem_cache=cache,
+                  pcm16k=args.pcm16k)
+        sys.exit(0)
+
     found_video = auto_find_video()
     
     if found_video:
-        clean_voice_final_v2(found_video)
+        clean_voice_final_v2(found_video, workers=args.workers, overlap_sec=args.overlap, stem_cache=cache,
+                             pcm16k=args.pcm16k)
     else:
         input("\nНажмите Enter, чтобы выйти...")
\ No newline at end of file
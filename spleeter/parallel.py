@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from audio_stream import write_wav
+from separator import get_separator
+
+# --- ПАРАЛЛЕЛЬНАЯ ЧИСТКА КУСКОВ ---
+# Каждый процесс пула держит свою модель (грузится один раз на процесс),
+# главный процесс только декодирует звук и раздает блоки.
+
+
+def _init_worker(threads: int):
+    import torch
+    torch.set_num_threads(threads)
+    get_separator()
+
+
+def model_format():
+    """(частота, каналы) модели — нужны, чтобы декодировать звук в ее формате"""
+    separator = get_separator()
+    return separator.samplerate, separator.audio_channels
+
+
+def separate_chunk_to_wav(pcm, out_path: str) -> str:
+    """Чистит один кусок и атомарно сохраняет его в *_clean.wav"""
+    separator = get_separator()
+    vocals = separator.separate_array(pcm)
+    # Недописанный *_clean.wav не должен считаться готовым
+    temp_path = out_path + ".tmp"
+    write_wav(temp_path, vocals, separator.samplerate)
+    os.replace(temp_path, out_path)
+    return out_path
+
+
+class SeparationPool:
+    """Пул из N процессов; в очереди держим не больше N+1 кусков, чтобы не раздувать память"""
+
+    def __init__(self, workers: int):
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(threads,))
+        self.max_pending = workers + 1
+        self.pending = {}
+
+    def model_format(self):
+        return self.executor.submit(model_format).result()
+
+    def submit(self, index: int, pcm, out_path: str):
+        """Ставит кусок в очередь; если очередь полна — ждет и возвращает готовые [(index, path)]"""
+        future = self.executor.submit(separate_chunk_to_wav, pcm, out_path)
+        self.pending[future] = index
+        done = []
+        while len(self.pending) >= self.max_pending:
+            done += self._collect(FIRST_COMPLETED)
+        return done
+
+    def drain(self):
+        """Дожидается всех оставшихся кусков"""
+        done = []
+        while self.pending:
+            done += self._collect(FIRST_COMPLETED)
+        return done
+
+    def _collect(self, return_when):
+        finished, _ = wait(list(self.pending), return_when=return_when)
+        done = []
+        for future in finished:
+            index = self.pending.pop(future)
+            done.append((index, future.result()))
+        return done
+
+    def reset(self):
+        """После сбоя файла: недоделанные куски отменяются, уже запущенные дожидаются и забываются.
+        Иначе их (index, path) достанутся следующему файлу пакета (индексы снова с 0)"""
+        for future in list(self.pending):
+            future.cancel()
+        wait(list(self.pending))
+        self.pending.clear()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
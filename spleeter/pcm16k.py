@@ -0,0 +1,64 @@
+import os
+import threading
+
+from pcm16k_format import SAMPLE_RATE, PCM16K_EXT, pack_header
+
+# --- ГОЛОС ДЛЯ ТРАНСКРИПЦИИ БЕЗ MP3: *_CLEAN.pcm16k ---
+# Формат — common/pcm16k_format.py (его же читает кэш transcription/audio_cache.py): заголовок
+# 64 байта + сырые float32 16 кГц моно. В заголовке — размер и mtime MP3 того же запуска: транскрибатор
+# берет звук отсюда через memmap (без декодирования MP3, ресемплинга и потерь сжатия), пока
+# MP3 не изменился. Перезаписали MP3 без --pcm16k — файл устарел и декодируется заново.
+
+READ_BLOCK = 1024 * 1024
+
+
+class Pcm16kWriter:
+    """Пишет поток f32le 16 кГц моно (stdout ffmpeg) в *.pcm16k в отдельном потоке"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.temp_path = path + ".tmp"
+        self.file = open(self.temp_path, "wb")
+        self.file.write(pack_header(0))
+        self.num_bytes = 0
+        self.thread = None
+        self.error = None
+
+    def start(self, stream):
+        def pump():
+            try:
+                while True:
+                    block = stream.read(READ_BLOCK)
+                    if not block:
+                        break
+                    self.file.write(block)
+                    self.num_bytes += len(block)
+            except Exception as e:
+                self.error = e
+
+        self.thread = threading.Thread(target=pump, daemon=True)
+        self.thread.start()
+
+    def finish(self, source_path: str = None):
+        """Дописывает заголовок (число сэмплов, размер и mtime готового source_path) и атомарно кладет файл"""
+        if self.thread:
+            self.thread.join()
+        if self.error:
+            self.abort()
+            raise self.error
+        st = os.stat(source_path) if source_path else None
+        self.file.seek(0)
+        self.file.write(pack_header(self.num_bytes // 4, st.st_size if st else 0, st.st_mtime_ns if st else 0))
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        if self.thread:
+            self.thread.join(timeout=5)
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.temp_path):
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
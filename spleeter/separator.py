@@ -0,0 +1,113 @@
+import os
+import threading
+
+import numpy as np
+
+# torch и demucs импортируются внутри DemucsSeparator: модулю пользуются и без модели
+# (заглушка из benchmarks/ через set_separator) — тогда их не нужно ни ставить, ни грузить в память
+
+# --- НАСТРОЙКИ НЕЙРОСЕТИ (как у `python -m demucs`) ---
+DEFAULT_MODEL = "htdemucs"
+DEFAULT_STEM = "vocals"  # --two-stems=vocals
+DEFAULT_SHIFTS = 0       # --shifts=0
+DEFAULT_OVERLAP = 0.25   # значение по умолчанию у demucs
+DEFAULT_JOBS = 0         # -j 0
+
+
+def separation_settings(model_name: str = DEFAULT_MODEL, stem: str = DEFAULT_STEM,
+                        shifts: int = DEFAULT_SHIFTS, overlap: float = DEFAULT_OVERLAP) -> dict:
+    """Настройки, от которых зависит результат (часть ключа кэша)"""
+    return {"model": model_name, "stem": stem, "shifts": shifts, "overlap": overlap}
+
+
+class DemucsSeparator:
+    """Demucs внутри процесса: модель грузится один раз и чистит все куски подряд"""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, device: str = "auto",
+                 stem: str = DEFAULT_STEM, shifts: int = DEFAULT_SHIFTS,
+                 overlap: float = DEFAULT_OVERLAP, jobs: int = DEFAULT_JOBS):
+        import torch
+        from demucs.pretrained import get_model
+
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+
+        self.model_name = model_name
+        self.device = device
+        self.stem = stem
+        self.shifts = shifts
+        self.overlap = overlap
+        self.jobs = jobs
+
+        print(f"   ⏳ Загрузка модели '{model_name}' ({device})...")
+        self.model = get_model(name=model_name)
+        self.model.cpu()
+        self.model.eval()
+        self.samplerate = self.model.samplerate
+        self.audio_channels = self.model.audio_channels
+        self.stem_index = self.model.sources.index(stem)
+        print(f"   ✓ Модель загружена")
+
+    def settings(self) -> dict:
+        return separation_settings(self.model_name, self.stem, self.shifts, self.overlap)
+
+    def separate_file(self, input_path: str, output_path: str) -> str:
+        """Вырезает голос из аудиофайла и сохраняет его в WAV"""
+        from demucs.audio import AudioFile, save_audio
+
+        wav = AudioFile(input_path).read(streams=0, samplerate=self.samplerate,
+                                         channels=self.audio_channels)
+        stem = self.separate_tensor(wav)
+        # Пишем во временный файл: недописанный *_clean.wav не должен считаться готовым
+        temp_path = output_path + ".tmp.wav"
+        save_audio(stem, temp_path, samplerate=self.samplerate)
+        os.replace(temp_path, output_path)
+        return output_path
+
+    def separate_array(self, pcm: np.ndarray) -> np.ndarray:
+        """pcm: numpy [каналы, сэмплы] в частоте модели -> голос той же формы"""
+        import torch
+
+        stem = self.separate_tensor(torch.from_numpy(pcm))
+        return stem.cpu().numpy()
+
+    def separate_tensor(self, wav: "torch.Tensor") -> "torch.Tensor":
+        """wav: [каналы, сэмплы] -> дорожка голоса той же формы"""
+        import torch
+        from demucs.apply import apply_model
+
+        # Нормализация та же, что делает demucs.separate
+        ref = wav.mean(0)
+        mean, std = ref.mean(), ref.std()
+        wav = (wav - mean) / (std + 1e-8)
+
+        with torch.no_grad():
+            sources = apply_model(self.model, wav[None], device=self.device,
+                                  shifts=self.shifts, split=True,
+                                  overlap=self.overlap, progress=False,
+                                  num_workers=self.jobs)[0]
+
+        stem = sources[self.stem_index]
+        return stem * (std + 1e-8) + mean
+
+
+# --- ОДНА МОДЕЛЬ НА ВЕСЬ ЗАПУСК ---
+_separator = None
+_separator_lock = threading.Lock()
+
+
+def get_separator(**kwargs) -> DemucsSeparator:
+    """Возвращает общий экземпляр (создается при первом вызове)"""
+    global _separator
+    with _separator_lock:
+        if _separator is None:
+            _separator = DemucsSeparator(**kwargs)
+        return _separator
+
+
+def set_separator(separator):
+    """Подменяет общий экземпляр (например, легкой заглушкой из benchmarks/).
+    Нужны samplerate, audio_channels и separate_array(pcm)"""
+    global _separator
+    with _separator_lock:
+        _separator = separator
@@ -0,0 +1,81 @@
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+# --- КЭШ ОЧИЩЕННЫХ КУСКОВ (между запусками и между файлами) ---
+# Ключ = хэш декодированного PCM куска + модель + настройки разделения.
+# Один и тот же звук (перезалитое или переименованное видео) второй раз не чистится.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "spleeter_stems")
+DEFAULT_CACHE_SIZE_GB = 20
+
+
+class StemCache:
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE_GB * 1024**3):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, pcm: np.ndarray, settings: dict) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        h.update(f"{pcm.dtype.str}{pcm.shape}".encode("utf-8"))
+        h.update(memoryview(np.ascontiguousarray(pcm)).cast("B"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.wav")
+
+    def get(self, key: str, out_path: str) -> bool:
+        """Копирует готовый голос в out_path; False — если в кэше нет"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return False
+        try:
+            os.utime(path)  # отметка для LRU: недавно использованный
+            temp_path = out_path + ".tmp"
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, out_path)
+            return True
+        except OSError:
+            return False
+
+    def put(self, key: str, src_path: str):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        temp_path = path + f".{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(src_path, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"   ⚠️  Не удалось положить кусок в кэш: {e}")
+            if os.path.exists(temp_path):
+                try: os.remove(temp_path)
+                except OSError: pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаляет самые давно использованные куски, пока кэш больше лимита"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".wav"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
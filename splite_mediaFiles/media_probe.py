@@ -0,0 +1,80 @@
+import os
+import json
+import shutil
+import threading
+import subprocess
+
+# --- КЭШ МЕТАДАННЫХ FFPROBE (длительность, дорожки, размер, mtime) ---
+# Файл, который не менялся (тот же размер и mtime), повторно не пробуется:
+# на сотнях записей это сотни запусков ffprobe при каждом старте.
+
+PROBE_CACHE_FILE = ".probe_cache.json"
+
+
+class ProbeError(RuntimeError):
+    """ffprobe не смог прочитать файл (вместо тихого 0.0)"""
+
+
+def get_ffprobe_path(ffmpeg_path):
+    # Меняем только имя файла: в пути к папке тоже может быть "ffmpeg"
+    folder, name = os.path.split(ffmpeg_path)
+    ffprobe_path = os.path.join(folder, name.replace("ffmpeg", "ffprobe"))
+    if folder and os.path.exists(ffprobe_path): return ffprobe_path
+    return shutil.which("ffprobe") or "ffprobe"
+
+
+def probe(ffprobe_path, file_path):
+    cmd = [ffprobe_path, "-v", "error", "-show_entries", "format=duration:stream=index,codec_type,codec_name",
+           "-of", "json", file_path]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore")
+    except OSError as e:
+        raise ProbeError(f"ffprobe не запускается ({ffprobe_path}): {e}")
+    if result.returncode != 0:
+        raise ProbeError(f"ffprobe: {result.stderr.strip() or f'код {result.returncode}'}")
+    try:
+        data = json.loads(result.stdout)
+        duration = float(data["format"]["duration"])
+    except (ValueError, KeyError) as e:
+        raise ProbeError(f"ffprobe не вернул длительность: {e}")
+    streams = [{"index": s.get("index"), "type": s.get("codec_type"), "codec": s.get("codec_name")}
+               for s in data.get("streams", [])]
+    return {"duration": duration, "streams": streams}
+
+
+class ProbeCache:
+    def __init__(self, path=PROBE_CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, ffprobe_path, file_path):
+        """Метаданные файла: из кэша, если файл не менялся, иначе через ffprobe"""
+        key = os.path.abspath(file_path)
+        st = os.stat(file_path)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry
+
+        entry = dict(probe(ffprobe_path, file_path), size=st.st_size, mtime_ns=st.st_mtime_ns)
+        with self.lock:
+            self.entries[key] = entry
+            self.dirty = True
+        return entry
+
+    def save(self):
+        with self.lock:
+            if not self.dirty: return
+            # Удаленные файлы из кэша убираем
+            self.entries = {k: v for k, v in self.entries.items() if os.path.exists(k)}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.path)
+            self.dirty = False
@@ -0,0 +1,84 @@
+import os
+import csv
+import json
+
+# --- МАНИФЕСТ ЧАСТЕЙ (*_parts.json) ---
+# Части пишутся с -reset_timestamps 1, поэтому внутри каждой части время начинается с нуля.
+# Сегментер ffmpeg сам сообщает реальные точки разреза (по ключевым кадрам) через
+# -segment_list ... csv — они сохраняются рядом с исходником, и разделение/транскрипция
+# переводят время части во время исходника без ffprobe:
+#
+#   from segment_manifest import to_source_time
+#   to_source_time("video_part_002.mp4", 12.5)  # -> 4812.5
+
+MANIFEST_SUFFIX = "_parts.json"
+MANIFEST_VERSION = 1
+PART_MARKER = "_part_"
+
+
+def manifest_path(source_path):
+    return os.path.splitext(source_path)[0] + MANIFEST_SUFFIX
+
+
+def write_manifest(csv_path, source_path, duration=None):
+    """CSV сегментера (имя,начало,конец) -> JSON-манифест рядом с исходником"""
+    parts = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 3: continue
+            name, start, end = row[0], float(row[1]), float(row[2])
+            parts.append({
+                "index": len(parts),
+                "path": os.path.basename(name),  # относительно папки манифеста
+                "start": round(start, 6),
+                "end": round(end, 6),
+                "duration": round(end - start, 6),
+            })
+
+    st = os.stat(source_path)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": os.path.basename(source_path),
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "duration": duration,
+        "parts": parts,
+    }
+    path = manifest_path(source_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(temp_path, path)
+    return path
+
+
+def read_segment_manifest(path):
+    """Манифест по пути к нему, к исходнику или к любой из частей; пути частей — абсолютные"""
+    if not path.endswith(MANIFEST_SUFFIX):
+        base, ext = os.path.splitext(path)
+        if PART_MARKER in os.path.basename(base):
+            base = base.rsplit(PART_MARKER, 1)[0]
+        path = base + MANIFEST_SUFFIX
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Неизвестная версия манифеста: {path}")
+    folder = os.path.dirname(os.path.abspath(path))
+    for part in manifest["parts"]:
+        part["path"] = os.path.join(folder, part["path"])
+    return manifest
+
+
+def find_part(part_path):
+    """Запись части в манифесте её исходника"""
+    manifest = read_segment_manifest(part_path)
+    name = os.path.basename(part_path)
+    for part in manifest["parts"]:
+        if os.path.basename(part["path"]) == name:
+            return part
+    raise KeyError(f"{name} нет в манифесте {manifest['source']}")
+
+
+def to_source_time(part_path, seconds):
+    """Время внутри части -> время в исходном файле"""
+    return find_part(part_path)["start"] + seconds
@@ -2,11 +2,22 @@ import os
 import subprocess
 import sys
 import shutil
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from media_probe import ProbeCache, ProbeError, get_ffprobe_path, probe
+from segment_manifest import write_manifest
 
 # --- НАСТРОЙКИ ---
 SPLIT_TIME_MIN = 40  # Длительность одной части в минутах
 SPLIT_TIME_SEC = SPLIT_TIME_MIN * 60
 
+# Параллельная нарезка: -c copy упирается в диск, поэтому на один диск — не больше DISK_JOBS
+DEFAULT_JOBS = max(1, min(4, (os.cpu_count() or 1) // 2))
+DEFAULT_DISK_JOBS = 2
+
 # Путь к FFmpeg
 HARDCODED_FFMPEG = r"C:\ffmpeg-2025-10-12-git-0bc54cddb1-essentials_build\ffmpeg-2025-10-12-git-0bc54cddb1-essentials_build\bin\ffmpeg.exe"
 
@@ -17,40 +28,113 @@ def get_ffmpeg_path():
     if shutil.which("ffmpeg"): return "ffmpeg"
     return None
 
-def get_duration(ffmpeg_path, file_path):
-    ffprobe_path = ffmpeg_path.replace("ffmpeg.exe", "ffprobe.exe")
-    if not os.path.exists(ffprobe_path): ffprobe_path = "ffprobe"
-    cmd = [ffprobe_path, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", file_path]
-    try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        return float(result.stdout.strip())
-    except: return 0.0
+def get_duration(ffmpeg_path, file_path, cache=None):
+    """Длительность в секундах; при ошибке — ProbeError (раньше тихо возвращался 0.0)"""
+    ffprobe_path = get_ffprobe_path(ffmpeg_path)
+    if cache is not None: return cache.get(ffprobe_path, file_path)["duration"]
+    return probe(ffprobe_path, file_path)["duration"]
 
-def split_video_by_time(ffmpeg_path, input_file):
+def split_video_by_time(ffmpeg_path, input_file, cache=None):
+    """Нарезка одного файла. Возвращает итог для сводки: статус, длительность, размер, время"""
+    started = time.perf_counter()
     base_name, ext = os.path.splitext(input_file)
-    duration = get_duration(ffmpeg_path, input_file)
+    result = {"file": input_file, "status": "failed", "duration": 0.0, "size": 0, "elapsed": 0.0}
+    # Любая ошибка одного файла — статус failed в сводке, а не падение всей пачки
+    try:
+        result["size"] = os.path.getsize(input_file)
+    except OSError as e:
+        print(f"❌ {input_file}: файл недоступен — {e}")
+        return result
+    try:
+        duration = get_duration(ffmpeg_path, input_file, cache)
+    except (ProbeError, OSError) as e:
+        print(f"❌ {input_file}: не удалось прочитать длительность — {e}")
+        return result
+    result["duration"] = duration
     duration_min = duration / 60
-    
+
     if duration_min <= SPLIT_TIME_MIN:
         print(f"✅ {input_file} короче {SPLIT_TIME_MIN} мин ({duration_min:.1f} мин). Пропускаем.")
-        return
+        result["status"] = "skipped"
+        return result
 
-    print(f"\n✂️ Обработка: {input_file} ({duration_min:.1f} мин)")
+    print(f"✂️ Обработка: {input_file} ({duration_min:.1f} мин)")
     output_pattern = f"{base_name}_part_%03d{ext}"
-    
+    # Реальные точки разреза (по ключевым кадрам) сегментер пишет в CSV -> манифест *_parts.json
+    segment_list = f"{base_name}_parts.csv"
+
     # Добавлен флаг -map 0 (все дорожки) и -c copy (без перекодировки)
+    # Несколько ffmpeg одновременно: вывод собираем, чтобы строки не перемешивались
     cmd = [
-        ffmpeg_path, "-i", input_file, "-c", "copy", "-map", "0",
+        ffmpeg_path, "-v", "error", "-nostdin", "-y", "-i", input_file, "-c", "copy", "-map", "0",
         "-f", "segment", "-segment_time", str(SPLIT_TIME_SEC),
-        "-reset_timestamps", "1", output_pattern
+        "-reset_timestamps", "1", "-segment_list", segment_list, "-segment_list_type", "csv",
+        output_pattern
     ]
     try:
-        subprocess.run(cmd, check=True)
-        print(f"✨ Готово! Файлы: {base_name}_part_XXX{ext}")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Ошибка: {e}")
+        process = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="ignore")
+    except OSError as e:
+        print(f"❌ Ошибка ({input_file}): не удалось запустить ffmpeg — {e}")
+        return result
+    result["elapsed"] = time.perf_counter() - started
+    if process.returncode != 0:
+        print(f"❌ Ошибка ({input_file}): {process.stderr.strip()[-500:] or f'код {process.returncode}'}")
+        return result
+    try:
+        write_manifest(segment_list, input_file, duration)
+    except (OSError, ValueError) as e:
+        print(f"❌ {input_file}: части нарезаны, но манифест не записан — {e}")
+        return result
+    finally:
+        if os.path.exists(segment_list): os.remove(segment_list)
+    result["status"] = "done"
+    print(f"✨ Готово! Файлы: {base_name}_part_XXX{ext} ({result['elapsed']:.1f} сек)")
+    return result
+
+def split_many(ffmpeg_path, files, jobs=DEFAULT_JOBS, disk_jobs=DEFAULT_DISK_JOBS, cache=None):
+    """Несколько файлов параллельно: всего не больше jobs, на один диск — не больше disk_jobs"""
+    disk_slots = {}
+    slots_lock = threading.Lock()
+
+    def run(path):
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            device = None  # файл пропал — split_video_by_time вернет failed
+        with slots_lock:
+            slot = disk_slots.setdefault(device, threading.Semaphore(disk_jobs))
+        with slot:
+            return split_video_by_time(ffmpeg_path, path, cache)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [executor.submit(run, f) for f in files]
+        for future in as_completed(futures):
+            results.append(future.result())
+    order = {f: i for i, f in enumerate(files)}
+    return sorted(results, key=lambda r: order[r["file"]])
+
+def print_summary(results, wall_time):
+    labels = {"done": "✂️", "skipped": "⏭", "failed": "❌"}
+    print(f"\n--- 📊 ИТОГ ---")
+    for r in results:
+        line = f"   {labels[r['status']]} {r['file']}: {r['duration'] / 60:.1f} мин, {r['size'] / 1024**2:.0f} МБ"
+        if r["status"] == "done" and r["elapsed"] > 0:
+            line += f" — {r['elapsed']:.1f} сек, {r['size'] / 1024**2 / r['elapsed']:.0f} МБ/с, x{r['duration'] / r['elapsed']:.0f} реального времени"
+        print(line)
+    done = [r for r in results if r["status"] == "done"]
+    total_mb = sum(r["size"] for r in done) / 1024**2
+    print(f"   Нарезано: {len(done)} | пропущено: {sum(r['status'] == 'skipped' for r in results)} | "
+          f"ошибок: {sum(r['status'] == 'failed' for r in results)}")
+    if done and wall_time > 0:
+        print(f"   ⏱ Общее время: {wall_time:.1f} сек, {total_mb / wall_time:.0f} МБ/с")
 
 def main():
+    parser = argparse.ArgumentParser(description="Нарезка видео на части по времени")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Сколько файлов резать одновременно")
+    parser.add_argument("--disk-jobs", type=int, default=DEFAULT_DISK_JOBS, help="Не больше стольких ffmpeg на один диск")
+    args = parser.parse_args()
+
     # --- ВАЖНОЕ ИСПРАВЛЕНИЕ: ПЕРЕХОДИМ В ПАПКУ СКРИПТА ---
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
@@ -58,7 +142,7 @@ def main():
 
     print(f"--- 🚀 AUTO SPLITTER ({SPLIT_TIME_MIN} min) ---")
     print(f"📂 Рабочая папка: {script_dir}")
-    
+
     ffmpeg = get_ffmpeg_path()
     if not ffmpeg:
         print("❌ FFmpeg не найден!")
@@ -68,21 +152,25 @@ def main():
     video_extensions = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v')
     # Ищем файлы уже в правильной папке
     files = [f for f in os.listdir('.') if f.lower().endswith(video_extensions)]
-    
+
     # Сортируем файлы (чтобы сначала шли part_001, если есть)
     files.sort()
+    files = [f for f in files if "_part_" not in f]
 
-    found_work = False
-    for f in files:
-        if "_part_" in f: continue
-        found_work = True
-        split_video_by_time(ffmpeg, f)
-
-    if not found_work:
+    if not files:
         print("📂 Подходящие видеофайлы не найдены (или они уже нарезаны).")
+    else:
+        print(f"🧵 Файлов: {len(files)}, одновременно: {args.jobs} (на диск: {args.disk_jobs})\n")
+        cache = ProbeCache()
+        started = time.perf_counter()
+        try:
+            results = split_many(ffmpeg, files, args.jobs, args.disk_jobs, cache)
+        finally:
+            cache.save()
+        print_summary(results, time.perf_counter() - started)
 
     print("\n🏁 Работа завершена.")
     input("Нажмите Enter, чтобы выйти...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,105 @@
+import os
+import subprocess
+
+import numpy as np
+
+from pcm16k_format import (SAMPLE_RATE, PCM16K_EXT as CACHE_EXT, DTYPE_FLOAT32, HEADER_SIZE,
+                           pack_header, unpack_header)
+
+# --- КЭШ ДЕКОДИРОВАННОГО АУДИО (16 кГц моно) ---
+# Файл декодируется через ffmpeg один раз и лежит рядом с аудио как *.pcm16k:
+# небольшой заголовок + сырые сэмплы. Файл открывается через np.memmap, поэтому
+# продолжение с любого места — это просто срез массива, без temp-файлов и ffmpeg.
+# Формат файла — common/pcm16k_format.py (тот же пишет spleeter --pcm16k).
+
+READ_BLOCK = 1024 * 1024
+
+
+def cache_path_for(audio_path: str) -> str:
+    if audio_path.lower().endswith(CACHE_EXT):
+        return audio_path
+    return os.path.splitext(audio_path)[0] + CACHE_EXT
+
+
+def write_header(f, num_samples: int, source_size: int = 0, source_mtime_ns: int = 0,
+                 dtype_code: int = DTYPE_FLOAT32, sample_rate: int = SAMPLE_RATE, channels: int = 1):
+    """source_size=0 — файл самостоятельный (не привязан к исходнику), всегда считается актуальным"""
+    f.seek(0)
+    f.write(pack_header(num_samples, source_size, source_mtime_ns, dtype_code, sample_rate, channels))
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        return unpack_header(f.read(HEADER_SIZE), path)
+
+
+def open_pcm(path: str) -> np.ndarray:
+    """Отображает кэш в память (без чтения всего файла). int16 переводится в float32 при срезе."""
+    header = read_header(path)
+    if header["sample_rate"] != SAMPLE_RATE or header["channels"] != 1:
+        raise ValueError(f"Ожидалось 16 кГц моно: {path}")
+    if header["num_samples"] == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(path, dtype=header["dtype"], mode="r", offset=HEADER_SIZE,
+                     shape=(header["num_samples"],))
+
+
+def as_float32(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples
+
+
+def _is_fresh(cache_path: str, audio_path: str) -> bool:
+    try:
+        header = read_header(cache_path)
+    except (OSError, ValueError):
+        return False
+    if header["source_size"] == 0 or os.path.abspath(cache_path) == os.path.abspath(audio_path):
+        return True  # самостоятельный файл или сам *.pcm16k на входе — декодировать нечего
+    st = os.stat(audio_path)
+    return header["source_size"] == st.st_size and header["source_mtime_ns"] == st.st_mtime_ns
+
+
+def _decode_to_cache(audio_path: str, cache_path: str, ffmpeg_cmd: str = None):
+    st = os.stat(audio_path)
+    temp_path = cache_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            write_header(f, 0)
+            num_bytes = 0
+            if ffmpeg_cmd:
+                process = subprocess.Popen([
+                    ffmpeg_cmd, '-v', 'error', '-nostdin', '-i', os.path.abspath(audio_path),
+                    '-ar', str(SAMPLE_RATE), '-ac', '1', '-f', 'f32le', 'pipe:1'
+                ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                while True:
+                    block = process.stdout.read(READ_BLOCK)
+                    if not block:
+                        break
+                    f.write(block)
+                    num_bytes += len(block)
+                err = process.stderr.read().decode("utf-8", errors="ignore")
+                if process.wait() != 0:
+                    raise RuntimeError(f"ffmpeg: {err.strip()}")
+            else:
+                # Без ffmpeg — встроенный декодер faster-whisper (PyAV)
+                from faster_whisper import decode_audio
+                samples = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+                f.write(samples.astype("<f4").tobytes())
+                num_bytes = samples.size * 4
+            write_header(f, num_bytes // 4, st.st_size, st.st_mtime_ns)
+        os.replace(temp_path, cache_path)
+    finally:
+        if os.path.exists(temp_path):
+            try: os.remove(temp_path)
+            except OSError: pass
+
+
+def get_decoded_audio(audio_path: str, ffmpeg_cmd: str = None) -> np.ndarray:
+    """16 кГц моно как memmap; декодирование только если кэша нет или исходник изменился"""
+    cache_path = cache_path_for(audio_path)
+    if not _is_fresh(cache_path, audio_path):
+        print(f"   ⚙️  Декодирование в кэш: {os.path.basename(cache_path)}")
+        _decode_to_cache(audio_path, cache_path, ffmpeg_cmd)
+    return open_pcm(cache_path)
@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+
+# --- ЗАМЕР СТАРТА: импорт speechToText и запуск без модели ---
+# Защита от регрессий: тяжелый стек (torch, faster_whisper, ctranslate2) не должен
+# подтягиваться при импорте, а --help / --dry-run должны укладываться в лимит.
+# Код возврата 1, если что-то из этого нарушено.
+
+HEAVY_MODULES = ("torch", "faster_whisper", "ctranslate2", "onnxruntime", "av")
+DEFAULT_MAX_MS = 1000
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import speechToText
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import():
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=HERE, capture_output=True,
+                            text=True, encoding="utf-8")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_command(args):
+    """Полное время процесса (старт интерпретатора + импорт + работа)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "speechToText.py"] + args, cwd=HERE, capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер времени старта speechToText.py")
+    parser.add_argument("--runs", type=int, default=5, help="Сколько запусков (берется лучший)")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS, help="Лимит на импорт и --dry-run (мс)")
+    args = parser.parse_args()
+
+    print(f"--- ⏱ ЗАМЕР СТАРТА ({args.runs} запусков, берется лучший) ---")
+    failed = False
+
+    probes = [measure_import() for _ in range(args.runs)]
+    import_ms = min(p["ms"] for p in probes)
+    heavy = sorted({m for p in probes for m in p["heavy"]})
+    print(f"   📦 import speechToText: {import_ms:.0f} мс")
+    if heavy:
+        print(f"   ❌ При импорте загружены тяжелые модули: {', '.join(heavy)}")
+        failed = True
+
+    # Постоянное имя: индекс файлов для этой папки в ~/.cache создается один раз
+    empty_dir = os.path.join(tempfile.gettempdir(), "stt_bench_empty")
+    os.makedirs(empty_dir, exist_ok=True)
+    for label, cmd in (("--help", ["--help"]), ("--dry-run", [empty_dir, "--dry-run"])):
+        ms = min(measure_command(cmd) for _ in range(args.runs))
+        mark = "✓" if ms <= args.max_ms else "❌"
+        print(f"   {mark} speechToText.py {label}: {ms:.0f} мс (лимит {args.max_ms:.0f})")
+        failed = failed or ms > args.max_ms
+
+    if import_ms > args.max_ms:
+        print(f"   ❌ Импорт дольше лимита {args.max_ms:.0f} мс")
+        failed = True
+
+    print(f"\n   {'❌ РЕГРЕССИЯ' if failed else '✅ Старт в норме'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
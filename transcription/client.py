@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import http.client
+from urllib.parse import urlparse
+from typing import Iterator
+
+# --- КЛИЕНТ СЕРВЕРА ТРАНСКРИПЦИИ ---
+# Модель уже загружена в server.py: клиент отправляет путь к файлу и получает
+# сегменты потоком (по одной JSON-строке), старт занимает миллисекунды.
+
+DEFAULT_SERVER = "http://127.0.0.1:8765"
+
+
+class TranscriptionClient:
+    def __init__(self, server_url: str = DEFAULT_SERVER, model: str = None):
+        """model=None — модель сервера по умолчанию"""
+        parsed = urlparse(server_url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 8765
+        self.model = model
+
+    def _request(self, method: str, path: str, payload: dict = None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=None)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        conn.request(method, path, body, {"Content-Type": "application/json"})
+        return conn, conn.getresponse()
+
+    def health(self) -> dict:
+        conn, resp = self._request("GET", "/health")
+        try:
+            return json.loads(resp.read())
+        finally:
+            conn.close()
+
+    def stream(self, audio_path: str):
+        """Генератор сообщений сервера: {'type': 'segment'|'done'|'error', ...}"""
+        payload = {"path": os.path.abspath(audio_path), "model": self.model}
+        conn, resp = self._request("POST", "/transcribe", payload)
+        try:
+            if resp.status != 200:
+                raise RuntimeError(f"Сервер ответил {resp.status}: {resp.read().decode('utf-8', errors='ignore')}")
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+    def transcribe(self, audio_path: str) -> Iterator[dict]:
+        """Сегменты файла по мере прихода с сервера, с прогрессом в консоли.
+        Генератор: экспорт пишет *.partial.* сразу, а не после всего файла"""
+        print(f"\n🎤 Отправляю на сервер: {os.path.basename(audio_path)}")
+        count = 0
+        for msg in self.stream(audio_path):
+            if msg["type"] == "segment":
+                seg = msg["segment"]
+                count += 1
+                sys.stdout.write(f"\r   🎤 {count} сегм. | {seg['end']:.0f} сек | {seg['text'][:40]}...")
+                sys.stdout.flush()
+                yield seg
+            elif msg["type"] == "error":
+                raise RuntimeError(f"Ошибка сервера: {msg['message']}")
+            elif msg["type"] == "done":
+                print(f"\n   ✓ Сервер закончил! Сегментов: {count}")
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+
+# --- ПОТОКОВЫЙ ЭКСПОРТ В НЕСКОЛЬКО ФОРМАТОВ ЗА ОДИН ПРОХОД ---
+# Сегменты пишутся по одному (из журнала прогресса или прямо во время распознавания),
+# весь список в памяти не нужен. Пока файл не готов, результат лежит в *.partial.srt и т.п.
+# (им уже можно пользоваться), в конце файлы переименовываются в итоговые.
+
+FORMATS = ("srt", "vtt", "txt", "json")
+DEFAULT_FORMATS = ("srt", "txt")
+FLUSH_INTERVAL = 5.0  # секунд — как часто частичные файлы сбрасываются на диск
+
+
+def seconds_to_hms(seconds: float, separator=":") -> str:
+    """Формат 00:00:00"""
+    m, s = divmod(seconds, 60)
+    h, m = divmod(m, 60)
+    return f"{int(h):02d}{separator}{int(m):02d}{separator}{int(s):02d}"
+
+
+def seconds_to_srt_time(seconds: float, ms_separator=",") -> str:
+    """Формат для SRT: 00:00:00,000 (для VTT — с точкой)"""
+    ms = int((seconds % 1) * 1000)
+    return f"{seconds_to_hms(seconds)}{ms_separator}{ms:03d}"
+
+
+def parse_formats(value: str):
+    formats = tuple(f.strip().lower() for f in value.split(",") if f.strip())
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Неизвестный формат: {', '.join(unknown)} (доступны: {', '.join(FORMATS)})")
+    return formats
+
+
+def output_path(base_path: str, fmt: str) -> str:
+    return f"{base_path}.{fmt}"
+
+
+class _Writer:
+    def __init__(self, path: str):
+        self.f = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, seg: dict):
+        self.count += 1
+        self._write(seg)
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class SrtWriter(_Writer):
+    def _write(self, seg):
+        start = seconds_to_srt_time(seg['start'])
+        end = seconds_to_srt_time(seg['end'])
+        self.f.write(f"{self.count}\n{start} --> {end}\n{seg['text'].strip()}\n\n")
+
+
+class VttWriter(_Writer):
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write("WEBVTT\n\n")
+
+    def _write(self, seg):
+        start = seconds_to_srt_time(seg['start'], ".")
+        end = seconds_to_srt_time(seg['end'], ".")
+        self.f.write(f"{start} --> {end}\n{seg['text'].strip()}\n\n")
+
+
+class TxtWriter(_Writer):
+    """Читаемый текст с таймкодами"""
+    def _write(self, seg):
+        self.f.write(f"[{seconds_to_hms(seg['start'])}] {seg['text'].strip()}\n")
+
+
+class JsonWriter(_Writer):
+    """{"segments": [...]} — пишется по одному элементу, со словами, если они есть"""
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write('{"segments": [')
+
+    def _write(self, seg):
+        prefix = "\n  " if self.count == 1 else ",\n  "
+        self.f.write(prefix + json.dumps(seg, ensure_ascii=False))
+
+    def close(self):
+        self.f.write("\n]}\n")
+        super().close()
+
+
+WRITERS = {"srt": SrtWriter, "vtt": VttWriter, "txt": TxtWriter, "json": JsonWriter}
+
+
+class MultiExporter:
+    """Один проход по сегментам -> все выбранные форматы сразу"""
+
+    def __init__(self, base_path: str, formats=DEFAULT_FORMATS, flush_interval: float = FLUSH_INTERVAL):
+        self.base_path = base_path
+        self.formats = formats
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        self.partial_paths = {fmt: f"{base_path}.partial.{fmt}" for fmt in formats}
+        self.writers = {fmt: WRITERS[fmt](self.partial_paths[fmt]) for fmt in formats}
+        self.count = 0
+
+    def write(self, seg: dict):
+        for writer in self.writers.values():
+            writer.write(seg)
+        self.count += 1
+        # Частичные субтитры доступны во время работы — сбрасываем раз в несколько секунд
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            for writer in self.writers.values():
+                writer.flush()
+            self.last_flush = time.monotonic()
+
+    def finish(self):
+        """Закрывает файлы и переименовывает *.partial.* в итоговые имена"""
+        finals = {}
+        for fmt, writer in self.writers.items():
+            writer.close()
+            finals[fmt] = output_path(self.base_path, fmt)
+            os.replace(self.partial_paths[fmt], finals[fmt])
+        return finals
+
+    def abort(self):
+        """Файл не готов: частичные файлы остаются на диске до следующего запуска"""
+        for writer in self.writers.values():
+            writer.close()
+
+
+def export_journal(journal, base_path: str, formats=DEFAULT_FORMATS):
+    """Экспорт из журнала прогресса одним потоковым проходом"""
+    exporter = MultiExporter(base_path, formats)
+    try:
+        for seg in journal.read_all():
+            exporter.write(seg)
+    except BaseException:
+        exporter.abort()
+        raise
+    return exporter.finish()
@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+
+# --- ИНДЕКС ФАЙЛОВ (path, size, mtime, status, formats) ---
+# Полный os.walk по архиву из десятков тысяч файлов — долго. Индекс помнит mtime каждой папки:
+# папка, в которой ничего не добавили и не удалили, не перечитывается (только stat самой папки).
+# Индекс лежит в ~/.cache/transcription_index, чтобы его запись не меняла mtime папки с аудио.
+# Старые temp_resume_*.wav удаляются заодно, при чтении измененной папки.
+# Дописанный или перезаписанный на месте файл mtime папки не меняет — такие файлы ловит
+# refresh() (stat только переданных файлов; режим --watch).
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "transcription_index")
+INDEX_VERSION = 1
+
+STATUS_NEW = "new"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class FileIndex:
+    def __init__(self, root: str, extensions, index_dir: str = DEFAULT_INDEX_DIR):
+        self.root = os.path.abspath(root)
+        self.extensions = {ext.lower() for ext in extensions}
+        digest = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(index_dir, f"{digest}.json")
+        self.dirs = {}
+        self.changed = []
+        self.relisted = set()  # папки, перечитанные при последнем scan() (в них что-то добавили/удалили)
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("root") == self.root:
+            self.dirs = data["dirs"]
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "root": self.root, "dirs": self.dirs}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    # --- СКАНИРОВАНИЕ ---
+    def _list_dir(self, path: str, old_entry: dict) -> dict:
+        """Перечитать одну папку: новые и измененные файлы получают статус 'new'"""
+        old_files = old_entry["files"] if old_entry else {}
+        files, subdirs = {}, []
+        cleaned = False
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                    continue
+                if entry.name.startswith("temp_resume_"):
+                    # 🧹 Временные файлы старой версии скрипта
+                    if entry.name.endswith(".wav"):
+                        try:
+                            os.remove(entry.path)
+                            cleaned = True
+                            print(f"🧹 Удален старый временный файл: {entry.name}")
+                        except OSError as e:
+                            print(f"⚠️  Не удалось удалить {entry.name}: {e}")
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in self.extensions:
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                old = old_files.get(entry.name)
+                if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                    files[entry.name] = old
+                else:
+                    files[entry.name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "status": STATUS_NEW}
+                    self.changed.append(entry.path)
+
+        # После удаления temp-файлов mtime папки сдвинулся — запоминаем новый
+        mtime_ns = os.stat(path).st_mtime_ns if cleaned else None
+        return {"mtime_ns": mtime_ns, "files": files, "subdirs": sorted(subdirs)}
+
+    def scan(self) -> list:
+        """Все аудиофайлы под root; перечитываются только папки с новым mtime"""
+        self.changed = []
+        self.relisted = set()
+        seen = set()
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(path)
+            entry = self.dirs.get(path)
+            if entry is None or entry["mtime_ns"] != mtime_ns:
+                try:
+                    entry = self._list_dir(path, entry)
+                except OSError:
+                    continue  # нет доступа — как os.walk, молча пропускаем
+                entry["mtime_ns"] = entry["mtime_ns"] or mtime_ns
+                self.dirs[path] = entry
+                self.relisted.add(path)
+                self.dirty = True
+            stack.extend(os.path.join(path, name) for name in entry["subdirs"])
+
+        for path in list(self.dirs):
+            if path not in seen:
+                del self.dirs[path]
+                self.dirty = True
+
+        return sorted(os.path.join(path, name) for path, entry in self.dirs.items() for name in entry["files"])
+
+    def refresh(self, file_paths) -> list:
+        """Перепроверить размер и mtime файлов (без чтения папок). Измененные снова 'new'; их и возвращает"""
+        changed = []
+        for file_path in file_paths:
+            record = self.get(file_path)
+            if record is None:
+                continue
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue  # удален — заметит scan() по mtime папки
+            if record["size"] != st.st_size or record["mtime_ns"] != st.st_mtime_ns:
+                record.update(size=st.st_size, mtime_ns=st.st_mtime_ns, status=STATUS_NEW)
+                record.pop("formats", None)
+                self.dirty = True
+                changed.append(file_path)
+        self.changed.extend(changed)
+        return changed
+
+    def known_done(self, file_path: str, formats) -> bool:
+        """Готов по индексу во всех formats, и его папку с прошлого раза не трогали
+        (выходные файлы никто не удалял). Новые форматы индекс не покрывает — их нужно экспортировать"""
+        record = self.get(file_path)
+        return (record is not None and record["status"] == STATUS_DONE
+                and set(formats) <= set(record.get("formats", ()))
+                and os.path.dirname(os.path.abspath(file_path)) not in self.relisted)
+
+    # --- СТАТУСЫ ---
+    def get(self, file_path: str):
+        directory, name = os.path.split(os.path.abspath(file_path))
+        entry = self.dirs.get(directory)
+        return entry["files"].get(name) if entry else None
+
+    def set_status(self, file_path: str, status: str, formats=None):
+        """formats — какие форматы сохранены (для 'done'): по ним known_done() решает, что делать нечего"""
+        record = self.get(file_path)
+        if record is None:
+            return
+        formats = set(formats or ()) if status == STATUS_DONE else set()
+        if formats and record["status"] == STATUS_DONE:
+            formats |= set(record.get("formats", ()))  # прошлые форматы никуда не делись
+        formats = sorted(formats) or None
+        if record["status"] != status or record.get("formats") != formats:
+            record["status"] = status
+            if formats:
+                record["formats"] = formats
+            else:
+                record.pop("formats", None)
+            self.dirty = True
+
+    def pending(self) -> list:
+        """Новые и измененные файлы (с ошибкой — только после изменения файла)"""
+        return sorted(os.path.join(path, name) for path, entry in self.dirs.items()
+                      for name, record in entry["files"].items() if record["status"] == STATUS_NEW)
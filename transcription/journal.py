@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import shutil
+
+# --- ЖУРНАЛ ПРОГРЕССА (*_PROGRESS.jsonl) С ГРУППОВОЙ ЗАПИСЬЮ ---
+# Сегменты копятся в памяти и сбрасываются на диск пачкой (по числу сегментов или по времени).
+# Рядом лежит маленький индекс *_PROGRESS.idx: где закончилась последняя запись и до какой
+# секунды дошли. Точка продолжения читается из индекса, без разбора всей истории.
+# После окончания файла журнал сжимается: дубли и оборванные строки убираются.
+
+DEFAULT_FLUSH_EVERY = 20      # сегментов
+DEFAULT_FLUSH_INTERVAL = 5.0  # секунд
+
+
+def _dumps(seg: dict) -> str:
+    return json.dumps(seg, ensure_ascii=False, separators=(",", ":"))
+
+
+class ProgressJournal:
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".idx"
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.file = None
+        self.state = None
+        self.last_commit = time.monotonic()
+
+    # --- ЧТЕНИЕ ---
+    def read_all(self):
+        """Потоковое чтение всех сегментов (оборванные строки пропускаются)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # недописанная строка после сбоя
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def _scan(self, offset: int, end: float, count: int) -> dict:
+        """Дочитывает журнал с offset: только то, что записано после последнего индекса"""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                offset += len(raw)
+                if raw.strip():
+                    try:
+                        seg = json.loads(raw)
+                    except ValueError:
+                        continue
+                    end = seg["end"]
+                    count += 1
+        return {"offset": offset, "end": end, "count": count, "complete": False}
+
+    def checkpoint(self) -> dict:
+        """{'end': секунда продолжения, 'count': сегментов, 'offset': байт, 'complete': bool} за O(1)"""
+        if self.state is not None:
+            return self.state
+        if not os.path.exists(self.path):
+            self.state = {"offset": 0, "end": 0.0, "count": 0, "complete": False}
+            return self.state
+
+        size = os.path.getsize(self.path)
+        index = None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if index and index.get("offset", -1) == size:
+            self.state = index
+        elif index and index.get("offset", -1) < size:
+            # Индекс отстал (сбой между записью и индексом) — дочитываем только хвост
+            self.state = self._scan(index["offset"], index["end"], index["count"])
+        else:
+            # Старый журнал без индекса (или индекс от другого файла) — разбираем один раз
+            self.state = self._scan(0, 0.0, 0)
+        return self.state
+
+    def reset(self):
+        """Начать заново: удаляет журнал и индекс"""
+        for path in (self.path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.buffer = []
+        self.state = None
+
+    def adopt(self, source_path: str):
+        """Взять готовый журнал (например, из кэша транскриптов) вместо текущего"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.buffer = []
+        shutil.copyfile(source_path, self.path)
+        self.compact()
+
+    # --- ЗАПИСЬ ---
+    def _open(self):
+        state = self.checkpoint()
+        self.file = open(self.path, "ab")
+        # Обрезаем оборванную последнюю строку, чтобы новая запись не склеилась с ней
+        if self.file.tell() > state["offset"]:
+            self.file.truncate(state["offset"])
+            self.file.seek(state["offset"])
+
+    def append(self, seg: dict):
+        self.buffer.append(seg)
+        if len(self.buffer) >= self.flush_every or \
+                time.monotonic() - self.last_commit >= self.flush_interval:
+            self.commit()
+
+    def commit(self):
+        """Групповая запись: пачка сегментов + fsync + индекс"""
+        self.last_commit = time.monotonic()
+        if not self.buffer:
+            return
+        if self.file is None:
+            self._open()
+        data = "".join(_dumps(seg) + "\n" for seg in self.buffer).encode("utf-8")
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        self.state = {
+            "offset": self.state["offset"] + len(data),
+            "end": self.buffer[-1]["end"],
+            "count": self.state["count"] + len(self.buffer),
+            "complete": False,
+        }
+        self.buffer = []
+        self._write_index()
+
+    def _write_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.index_path)
+
+    def close(self, complete: bool = False):
+        self.commit()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if complete:
+            self.compact()
+
+    def compact(self):
+        """Финальная форма: сегменты строго по порядку, без дублей наложения и мусора"""
+        temp_path = self.path + ".tmp"
+        last_end = -1.0
+        count = 0
+        with open(temp_path, "wb") as out:
+            for seg in self.read_all():
+                if seg["end"] <= last_end:
+                    continue
+                out.write((_dumps(seg) + "\n").encode("utf-8"))
+                last_end = seg["end"]
+                count += 1
+            out.flush()
+            os.fsync(out.fileno())
+            offset = out.tell()
+        os.replace(temp_path, self.path)
+        self.state = {"offset": offset, "end": max(last_end, 0.0), "count": count, "complete": True}
+        self._write_index()
@@ -0,0 +1,147 @@
+import os
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from speechToText import AudioTranscriber, DEFAULT_MODEL
+from transcript_cache import TranscriptCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB
+
+# --- СЕРВЕР ТРАНСКРИПЦИИ: МОДЕЛИ ВСЕГДА В ПАМЯТИ ---
+# Модель грузится один раз при старте сервера (1-2 минуты), дальше каждый
+# запуск `speechToText.py --server ...` начинает работу сразу.
+#
+#   POST /transcribe  {"path": "...", "model": "large-v3"}  -> поток JSON-строк
+#   GET  /health                                             -> загруженные модели
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ModelRegistry:
+    """Загруженные модели; одна модель — одна транскрипция за раз"""
+
+    def __init__(self, device: str, app_kwargs: dict):
+        self.device = device
+        self.app_kwargs = app_kwargs
+        self.models = {}
+        self.locks = {}
+        self.registry_lock = threading.Lock()
+
+    def get(self, model_size: str):
+        with self.registry_lock:
+            if model_size not in self.models:
+                self.models[model_size] = AudioTranscriber(
+                    model_size=model_size, device=self.device, **self.app_kwargs
+                )
+                self.locks[model_size] = threading.Lock()
+            return self.models[model_size], self.locks[model_size]
+
+
+class TranscriptionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    registry = None
+    default_model = DEFAULT_MODEL
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_line(self, payload: dict):
+        """Одна JSON-строка = один chunk (Transfer-Encoding: chunked)"""
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "models": sorted(self.registry.models)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/transcribe":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            audio_path = request["path"]
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": f"неверный запрос: {e}"})
+            return
+        if not os.path.isfile(audio_path):
+            self._send_json(404, {"error": f"файл не найден: {audio_path}"})
+            return
+
+        model_size = request.get("model") or self.default_model
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            app, lock = self.registry.get(model_size)
+            sent = []
+
+            def send_segment(seg):
+                self._send_line({"type": "segment", "segment": seg})
+                sent.append(1)
+
+            with lock:
+                app.transcribe(audio_path, progress_callback=lambda *a: None,
+                               on_segment=send_segment, return_segments=False)
+            self._send_line({"type": "done", "segments": len(sent)})
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент отключился — прогресс уже в *_PROGRESS.jsonl, продолжим при следующем запросе
+            print(f"   ⚠️  Клиент отключился: {os.path.basename(audio_path)}")
+            return
+        except Exception as e:
+            print(f"   ❌ Ошибка: {e}")
+            self._send_line({"type": "error", "message": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        print(f"   🌐 {self.address_string()} {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сервер транскрипции (модели всегда в памяти)")
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL], help="Какие модели загрузить сразу (первая — по умолчанию)")
+    parser.add_argument("--device", default="auto", help="Устройство (cuda, cpu, auto)")
+    parser.add_argument("--ffmpeg", default=None, help="Путь к ffmpeg.exe вручную")
+    parser.add_argument("--batch-size", type=int, default=0, help="Пакетный режим (0 = выкл)")
+    parser.add_argument("--span-workers", type=int, default=1, help="Параллельные куски внутри файла")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Папка кэша готовых транскриптов")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB, help="Лимит кэша транскриптов (МБ)")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш транскриптов")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    transcript_cache = None if args.no_cache else TranscriptCache(args.cache_dir, args.cache_size_mb * 1024**2)
+    registry = ModelRegistry(args.device, dict(ffmpeg_path=args.ffmpeg, batch_size=args.batch_size,
+                                               span_workers=args.span_workers, transcript_cache=transcript_cache))
+    for model_size in args.models:
+        registry.get(model_size)
+
+    TranscriptionHandler.registry = registry
+    TranscriptionHandler.default_model = args.models[0]
+    server = ThreadingHTTPServer((args.host, args.port), TranscriptionHandler)
+    print(f"\n🟢 Сервер слушает http://{args.host}:{args.port} (модели: {', '.join(args.models)})")
+    print(f"   💡 Клиент: python speechToText.py <папка> --server http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n⏹ Сервер остановлен")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
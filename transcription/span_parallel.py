@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+from audio_cache import SAMPLE_RATE
+from speech_map import transcribe_speech
+
+# --- ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА ОДНОГО ДЛИННОГО ФАЙЛА ---
+# Участки речи из карты VAD (*.vad.json) группируются в независимые куски по паузам,
+# куски распознаются одновременно в потоках одной модели (WhisperModel(num_workers=N)),
+# а результат отдается по порядку с глобальными таймкодами.
+
+DEFAULT_SPAN_SEC = 600  # примерная длина куска (10 мин)
+
+
+def plan_spans(chunks: List[dict], span_sec: float = DEFAULT_SPAN_SEC) -> List[List[dict]]:
+    """Группы участков речи (~span_sec каждая); граница куска всегда приходится на паузу"""
+    span_samples = int(span_sec * SAMPLE_RATE)
+    spans = []
+    current = []
+    for chunk in chunks:
+        if current and chunk["end"] - current[0]["start"] > span_samples:
+            spans.append(current)
+            current = []
+        current.append(chunk)
+    if current:
+        spans.append(current)
+    return spans
+
+
+def transcribe_spans(model, audio: np.ndarray, spans: List[List[dict]], workers: int,
+                     language: str = "ru", word_timestamps: bool = False):
+    """Генератор сегментов по порядку; куски считаются параллельно, но отдаются строго последовательно"""
+
+    def run(span):
+        return list(transcribe_speech(model, audio, span, language=language, word_timestamps=word_timestamps))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, span) for span in spans]
+        try:
+            for future in futures:
+                for segment in future.result():
+                    yield segment
+        finally:
+            for future in futures:
+                future.cancel()
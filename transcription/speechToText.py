@@ -1,61 +1,199 @@
 import os
-import json
 import argparse
-import subprocess
 import sys
 import shutil
 import time  # Added time logic
-import torch
+import difflib
 from typing import List
-from faster_whisper import WhisperModel
+
+# Общие модули (common/ рядом со всеми инструментами): измерения и формат *.pcm16k.
+# Путь добавляется до своих импортов — audio_cache/pcm16k берут формат оттуда
+COMMON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common")
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+
+# torch и faster_whisper здесь не импортируются: --help, --dry-run и уже готовые файлы
+# не должны ждать несколько секунд тяжелого импорта (см. bench_startup.py)
+from span_parallel import plan_spans, transcribe_spans
+from speech_map import (get_speech_chunks, clip_chunks, transcribe_speech, transcribe_speech_batched,
+                        SEQUENTIAL_VAD, BATCHED_VAD)
+from audio_cache import get_decoded_audio, SAMPLE_RATE, CACHE_EXT
+from journal import ProgressJournal, DEFAULT_FLUSH_EVERY, DEFAULT_FLUSH_INTERVAL
+from exporters import (MultiExporter, SrtWriter, TxtWriter, DEFAULT_FORMATS, output_path, parse_formats,
+                       export_journal, seconds_to_hms, seconds_to_srt_time)
+from file_index import FileIndex, STATUS_DONE, STATUS_FAILED
+from transcript_cache import TranscriptCache, audio_fingerprint, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB
+from instrumentation import get_metrics, configure as configure_metrics
 
 # Настройка кодировки для Windows консоли (безопасный метод для Python 3.7+)
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
-print("🔁 Инициализация скрипта...", flush=True)
-
 # --- НАСТРОЙКИ ПО УМОЛЧАНИЮ ---
-SUPPORTED_FORMATS = {'.wav', '.mp3', '.ogg', '.m4a', '.flac', '.wma', '.opus'}
+# .pcm16k — 16 кГц моно без сжатия (spleeter/main.py --pcm16k): открывается через memmap без ffmpeg
+SUPPORTED_FORMATS = {'.wav', '.mp3', '.ogg', '.m4a', '.flac', '.wma', '.opus', CACHE_EXT}
 DEFAULT_MODEL = "large-v3"
+DEFAULT_WATCH_INTERVAL = 30  # секунд между проверками папки в режиме --watch
+WATCH_FULL_CHECK = 10        # раз в столько проверок stat всех файлов (перезаписанные на месте)
 DEFAULT_COMPUTE = "int8" # float16 для GPU, int8 для CPU
+LANGUAGE = "ru"
 
 # === ТВОЙ ПУТЬ К FFMPEG ===
 # Можно переопределить через аргумент --ffmpeg
 HARDCODED_FFMPEG = r"C:\ffmpeg-2025-10-12-git-0bc54cddb1-essentials_build\ffmpeg-2025-10-12-git-0bc54cddb1-essentials_build\bin\ffmpeg.exe"
 
+def detect_device(device: str = "auto") -> str:
+    """cuda или cpu — без torch: ctranslate2 (движок faster-whisper) сам считает GPU"""
+    if device != "auto":
+        return device
+    import ctranslate2
+    try:
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except Exception:
+        return "cpu"
+
 class AudioTranscriber:
-    def __init__(self, model_size: str, device: str, compute_type: str, ffmpeg_path: str = None):
+    def __init__(self, model_size: str, device: str = "auto", compute_type: str = None, ffmpeg_path: str = None,
+                 batch_size: int = 0, cpu_threads: int = 0, span_workers: int = 1,
+                 journal_flush_every: int = DEFAULT_FLUSH_EVERY,
+                 journal_flush_interval: float = DEFAULT_FLUSH_INTERVAL, word_timestamps: bool = False,
+                 transcript_cache: TranscriptCache = None, model=None):
+        """model — готовая модель с интерфейсом WhisperModel.transcribe (например, заглушка
+        из benchmarks/): тогда WhisperModel не грузится"""
         self.ffmpeg_path = ffmpeg_path
+        self.model_size = model_size
+        self.transcript_cache = transcript_cache
+        self.word_timestamps = word_timestamps
+        self.journal_flush_every = journal_flush_every
+        self.journal_flush_interval = journal_flush_interval
+        self.batch_size = batch_size
+        self.batched = None
+        self.span_workers = span_workers
         
+        if model is not None:
+            self.model = model
+            self.compute_type = compute_type
+            if batch_size > 1:
+                from faster_whisper import BatchedInferencePipeline
+                self.batched = BatchedInferencePipeline(model=self.model)
+            return
+
+        # Модель грузится только здесь — импорт faster_whisper тоже
+        from faster_whisper import WhisperModel, BatchedInferencePipeline
+
         # Логика выбора устройства
-        if device == "auto":
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+        device = detect_device(device)
+        compute_type = compute_type or ("float16" if device == "cuda" else DEFAULT_COMPUTE)
+        self.compute_type = compute_type
         
         print(f"\n⏳ Загрузка модели '{model_size}'...")
         print(f"   📍 Устройство: {device} ({compute_type})")
         print(f"   ⚠️  Это может занять 1-2 минуты при первом запуске...")
+        load_started = time.perf_counter()
         try:
-            self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+            self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads,
+                                      num_workers=span_workers)
             print(f"   ✓ Модель загружена успешно!\n")
         except Exception as e:
             print(f"   ⚠️  Не удалось загрузить на {device}. Пробуем CPU int8...")
             print(f"   Ошибка: {e}")
-            self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+            self.model = WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads,
+                                      num_workers=span_workers)
+            self.compute_type = "int8"
             print(f"   ✓ Модель загружена на CPU!\n")
+        get_metrics().observe("model_load_seconds", time.perf_counter() - load_started, component="whisper",
+                              model=model_size, compute_type=self.compute_type)
+
+        # Пакетный режим: окна речи после VAD декодируются пачками по batch_size
+        if batch_size > 1:
+            self.batched = BatchedInferencePipeline(model=self.model)
+            print(f"   📦 Пакетный режим: batch_size={batch_size}\n")
+
+    def _run_model(self, audio, batched: bool = None, speech=None):
+        """Запуск модели: пакетный или последовательный путь.
+        speech — готовая карта речи: VAD не пересчитывается, модель получает только речь"""
+        if batched is None:
+            batched = self.batched is not None
+        if batched:
+            if self.batched is None:
+                from faster_whisper import BatchedInferencePipeline
+                self.batched = BatchedInferencePipeline(model=self.model)
+            pipeline = self.batched
+            if speech is not None:
+                return transcribe_speech_batched(pipeline, audio, speech, language=LANGUAGE,
+                                                 batch_size=max(self.batch_size, 2),
+                                                 word_timestamps=self.word_timestamps), None
+            return pipeline.transcribe(audio, language=LANGUAGE, vad_filter=True,
+                                       batch_size=max(self.batch_size, 2),
+                                       word_timestamps=self.word_timestamps)
+        if speech is not None:
+            return transcribe_speech(self.model, audio, speech, language=LANGUAGE,
+                                     word_timestamps=self.word_timestamps), None
+        return self.model.transcribe(audio, language=LANGUAGE, vad_filter=True,
+                                     word_timestamps=self.word_timestamps)
+
+    def speech_chunks(self, audio_path: str, audio=None) -> List[dict]:
+        """Карта речи файла [{'start', 'end'} в сэмплах 16 кГц] — из *.vad.json или через VAD один раз"""
+        if audio is None:
+            audio = get_decoded_audio(audio_path, self._get_ffmpeg_cmd())
+        # Пакетный путь режет речь по 30 сек — у него своя карта (в том же *.vad.json)
+        params = BATCHED_VAD if self.batched is not None and self.span_workers <= 1 else SEQUENTIAL_VAD
+        with get_metrics().timer("vad", component="transcription"):
+            return get_speech_chunks(audio_path, audio, params)
+
+    def transcribe_array(self, audio):
+        """Кусок звука из памяти (16 кГц моно float32) — для конвейера; прогресс и журнал не трогаются"""
+        segments, _ = self._run_model(audio)
+        return segments
 
-    def _seconds_to_hms(self, seconds: float, separator=":") -> str:
+    def transcribe_speech(self, audio_path: str, chunks: List[dict] = None):
+        """Распознать только выбранные участки речи (по умолчанию — все из карты VAD).
+        Сегменты faster-whisper с таймкодами от начала файла; прогресс и журнал не трогаются"""
+        audio = get_decoded_audio(audio_path, self._get_ffmpeg_cmd())
+        if chunks is None:
+            chunks = self.speech_chunks(audio_path, audio)
+        segments, _ = self._run_model(audio, speech=chunks)
+        return segments
+
+    def cache_settings(self) -> dict:
+        """Всё, от чего зависит текст: входит в ключ кэша транскриптов"""
+        return {
+            "model": self.model_size,
+            "compute_type": self.compute_type,
+            "language": LANGUAGE,
+            "vad_filter": True,
+            "batched": self.batched is not None,
+            "spans": self.span_workers > 1,
+            "word_timestamps": self.word_timestamps,
+        }
+
+    def compare_batched(self, audio_path: str):
+        """Замер: последовательный путь против пакетного на одном файле (прогресс не трогаем)"""
+        print(f"\n⏱ Сравнение режимов: {os.path.basename(audio_path)}")
+        results = {}
+        for batched in (False, True):
+            start = time.perf_counter()
+            segments, info = self._run_model(audio_path, batched=batched)
+            segments = [(s.start, s.end, s.text.strip()) for s in segments]
+            elapsed = time.perf_counter() - start
+            results[batched] = (segments, elapsed)
+            label = "пакетный" if batched else "последовательный"
+            print(f"   {label:>16}: {elapsed:.1f} сек, x{info.duration / elapsed:.1f} реального времени, сегментов: {len(segments)}")
+
+        (seq, seq_time), (bat, bat_time) = results[False], results[True]
+        similarity = difflib.SequenceMatcher(None, " ".join(s[2] for s in seq), " ".join(s[2] for s in bat)).ratio()
+        print(f"   ⚡ Ускорение: x{seq_time / bat_time:.2f} | совпадение текста: {similarity * 100:.1f}%")
+
+    @staticmethod
+    def _seconds_to_hms(seconds: float, separator=":") -> str:
         """Формат 00:00:00"""
-        m, s = divmod(seconds, 60)
-        h, m = divmod(m, 60)
-        return f"{int(h):02d}{separator}{int(m):02d}{separator}{int(s):02d}"
+        return seconds_to_hms(seconds, separator)
 
-    def _seconds_to_srt_time(self, seconds: float) -> str:
+    @staticmethod
+    def _seconds_to_srt_time(seconds: float) -> str:
         """Формат для SRT: 00:00:00,000"""
-        parts = self._seconds_to_hms(seconds, ":")
-        ms = int((seconds % 1) * 1000)
-        return f"{parts},{ms:03d}"
+        return seconds_to_srt_time(seconds)
 
     def _get_ffmpeg_cmd(self):
         # 1. Приоритет: аргумент командной строки
@@ -69,46 +207,53 @@ class AudioTranscriber:
             return "ffmpeg"
         return None
 
-    def export_srt(self, segments, output_path):
+    @staticmethod
+    def export_srt(segments, output_path):
         """Создание файла субтитров"""
-        with open(output_path, "w", encoding="utf-8") as f:
-            for i, seg in enumerate(segments, 1):
-                start = self._seconds_to_srt_time(seg['start'])
-                end = self._seconds_to_srt_time(seg['end'])
-                text = seg['text'].strip()
-                f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
-
-    def export_readable(self, segments, output_path):
+        writer = SrtWriter(output_path)
+        for seg in segments:
+            writer.write(seg)
+        writer.close()
+
+    @staticmethod
+    def export_readable(segments, output_path):
         """Создание читаемого текстового файла с таймкодами"""
-        with open(output_path, "w", encoding="utf-8") as f:
-            for seg in segments:
-                time_mark = self._seconds_to_hms(seg['start'])
-                f.write(f"[{time_mark}] {seg['text'].strip()}\n")
+        writer = TxtWriter(output_path)
+        for seg in segments:
+            writer.write(seg)
+        writer.close()
 
-    def transcribe(self, audio_path: str) -> List[dict]:
+    def transcribe(self, audio_path: str, progress_callback=None, on_segment=None,
+                   return_segments: bool = True) -> List[dict]:
+        """progress_callback(percent, seconds, text) — вместо строки прогресса в консоли (для пула процессов),
+        on_segment(seg) — вызывается для каждого сегмента файла по порядку, включая уже сохраненные
+        (сервер, потоковый экспорт); return_segments=False — не собирать весь список в памяти"""
         base_name = os.path.splitext(audio_path)[0]
         progress_file = f"{base_name}_PROGRESS.jsonl"
         
-        existing_segments = []
+        journal = ProgressJournal(progress_file, self.journal_flush_every, self.journal_flush_interval)
         resume_timestamp = 0.0
-        temp_cut_file = None  # Инициализируем здесь для доступа в finally
         
-        # --- ВОЗОБНОВЛЕНИЕ ---
-        if os.path.exists(progress_file):
-            try:
-                with open(progress_file, 'r', encoding='utf-8') as pf:
-                    for line in pf:
-                        if line.strip(): 
-                            existing_segments.append(json.loads(line))
-                if existing_segments:
-                    resume_timestamp = existing_segments[-1]['end']
-                    print(f"   🔄 Найден прогресс! Продолжаем с {self._seconds_to_hms(resume_timestamp)}")
-                    print(f"   📊 Уже обработано сегментов: {len(existing_segments)}")
-            except Exception as err:
-                print(f"   ⚠️  Ошибка чтения прогресса: {err}")
-                print(f"   🔁 Начинаем с начала...")
-                existing_segments = []
-                resume_timestamp = 0.0
+        # --- ВОЗОБНОВЛЕНИЕ (точка продолжения — из индекса журнала, без разбора всей истории) ---
+        try:
+            checkpoint = journal.checkpoint()
+        except Exception as err:
+            print(f"   ⚠️  Ошибка чтения прогресса: {err}")
+            print(f"   🔁 Начинаем с начала...")
+            journal.reset()
+            checkpoint = journal.checkpoint()
+
+        if checkpoint["count"]:
+            resume_timestamp = checkpoint["end"]
+            print(f"   🔄 Найден прогресс! Продолжаем с {self._seconds_to_hms(resume_timestamp)}")
+            print(f"   📊 Уже обработано сегментов: {checkpoint['count']}")
+
+        if checkpoint["complete"]:
+            print(f"   ✅ Файл уже распознан полностью")
+            if on_segment:
+                for seg_data in journal.read_all():
+                    on_segment(seg_data)
+            return list(journal.read_all()) if return_segments else None
 
         print(f"\n🎤 Начинаю обработку: {os.path.basename(audio_path)}")
         
@@ -116,212 +261,404 @@ class AudioTranscriber:
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Аудиофайл не найден: {audio_path}")
         
-        process_path = audio_path
-        time_shift = 0.0 
-        
         ffmpeg_cmd = self._get_ffmpeg_cmd()
+        if not ffmpeg_cmd:
+            print(f"   ⚠️  FFmpeg не найден. Декодирование через встроенный декодер (медленнее).")
+
+        # --- ДЕКОДИРОВАННОЕ АУДИО (КЭШ) ---
+        # 16 кГц моно декодируется один раз в *.pcm16k рядом с файлом и открывается через memmap:
+        # продолжение с любого места — срез массива, без temp-файлов и повторного ffmpeg
+        metrics = get_metrics()
+        with metrics.timer("decode", component="transcription"):
+            audio = get_decoded_audio(audio_path, ffmpeg_cmd)
 
-        # --- ОБРЕЗКА (ОПТИМИЗАЦИЯ) ---
+        # --- КЭШ ТРАНСКРИПТОВ: тот же звук с теми же настройками уже распознавался ---
+        cache_key = None
+        if self.transcript_cache is not None:
+            cache_key = self.transcript_cache.key(audio_fingerprint(audio), self.cache_settings())
+            cached = self.transcript_cache.get(cache_key)
+            if cached:
+                journal.adopt(cached)
+                print(f"   ⚡ Найден в кэше транскриптов! Сегментов: {journal.checkpoint()['count']}")
+                if on_segment:
+                    for seg_data in journal.read_all():
+                        on_segment(seg_data)
+                return list(journal.read_all()) if return_segments else None
+
+        if on_segment:
+            for seg_data in journal.read_all():
+                on_segment(seg_data)
+
+        # --- КАРТА РЕЧИ: VAD считается один раз на файл (*.vad.json), дальше только чтение ---
+        # Продолжение = карта обрезается по точке продолжения; тишина в модель не попадает
+        start_sample = min(int(resume_timestamp * SAMPLE_RATE), len(audio))
+        speech = clip_chunks(self.speech_chunks(audio_path, audio), start_sample)
+        if start_sample:
+            print(f"   ✂️  Пропускаем обработанную часть: {self._seconds_to_hms(start_sample / SAMPLE_RATE)}")
+
+        # --- ТРАНСКРИБАЦИЯ ---
+        print(f"   🚀 Запуск транскрибации...\n")
+        started = time.perf_counter()
+        if self.span_workers > 1:
+            # Один длинный файл: куски между паузами распознаются одновременно
+            spans = plan_spans(speech)
+            print(f"   🧩 Кусков между паузами: {len(spans)}, потоков: {self.span_workers}\n")
+            segments = transcribe_spans(self.model, audio, spans, self.span_workers,
+                                        language=LANGUAGE, word_timestamps=self.word_timestamps)
+        else:
+            segments, _ = self._run_model(audio, speech=speech)
+        total_duration = len(audio) / SAMPLE_RATE
+        media_duration = total_duration - start_sample / SAMPLE_RATE
+        
+        processed_count = 0
+        completed = False
         try:
-            if resume_timestamp > 5.0:
-                if ffmpeg_cmd:
-                    # ИСПРАВЛЕНИЕ: используем абсолютный путь и расширение .wav для PCM
-                    audio_dir = os.path.dirname(os.path.abspath(audio_path))
-                    temp_cut_file = os.path.join(audio_dir, f"temp_resume_{os.path.splitext(os.path.basename(audio_path))[0]}.wav")
-                    
-                    print(f"   ⚙️  Подготовка FFmpeg...")
-                    print(f"   📁 Создание временного файла с позиции {self._seconds_to_hms(resume_timestamp)}")
-                    
-                    try:
-                        # Удаляем старый temp файл если есть
-                        if os.path.exists(temp_cut_file):
-                            os.remove(temp_cut_file)
-                        
-                        subprocess.run([
-                            ffmpeg_cmd, '-y', '-v', 'quiet', '-ss', str(resume_timestamp), 
-                            '-i', os.path.abspath(audio_path), '-ar', '16000', '-ac', '1', '-c:a', 'pcm_s16le', temp_cut_file
-                        ], check=True, timeout=60)
-                        
-                        # Проверяем что файл создан и не поврежден (минимум 1KB)
-                        if os.path.exists(temp_cut_file) and os.path.getsize(temp_cut_file) > 1024:
-                            process_path = temp_cut_file
-                            time_shift = resume_timestamp
-                            print(f"   ✓ Временный файл готов!")
-                        else:
-                            print(f"   ⚠️  Временный файл не создан. Обрабатываем полный файл.")
-                            temp_cut_file = None
-                            
-                    except subprocess.TimeoutExpired:
-                        print(f"   ⚠️  FFmpeg завис (timeout). Работаем с полным файлом.")
-                        if temp_cut_file and os.path.exists(temp_cut_file):
-                            try: os.remove(temp_cut_file)
-                            except: pass
-                        temp_cut_file = None
-                    except Exception as e:
-                        print(f"   ⚠️  Ошибка FFmpeg: {e}")
-                        print(f"   🔄 Работаем с полным файлом (будет дольше, но надежнее)")
-                        if temp_cut_file and os.path.exists(temp_cut_file):
-                            try: os.remove(temp_cut_file)
-                            except: pass
-                        temp_cut_file = None
+            # Задержка сегмента — сколько модель думала над ним (выключенные метрики итератор не трогают)
+            for segment in metrics.timed_iter(segments, "asr_segment_latency", component="transcription"):
+                current_start = segment.start
+                current_end = segment.end
+                
+                # Защита от дублей при наложении
+                if current_end <= resume_timestamp + 0.1:
+                    continue
+                
+                percent = int((current_end / total_duration * 100)) if total_duration else 0
+                
+                text_preview = segment.text.strip()[:40]
+                if progress_callback:
+                    progress_callback(percent, current_end, text_preview)
                 else:
-                    print(f"   ⚠️  FFmpeg не найден. Пропуск обработанной части будет программным.")
-            
-            # --- ТРАНСКРИБАЦИЯ ---
-            print(f"   🚀 Запуск транскрибации...\n")
-            segments, info = self.model.transcribe(process_path, language="ru", vad_filter=True)
-            total_duration = info.duration + time_shift 
-            
-            processed_count = 0
-            with open(progress_file, 'a', encoding='utf-8') as pf:
-                for segment in segments:
-                    current_start = segment.start + time_shift
-                    current_end = segment.end + time_shift
-                    
-                    # Защита от дублей при наложении
-                    if current_end <= resume_timestamp + 0.1:
-                        continue
-                    
-                    percent = int((current_end / total_duration * 100)) if total_duration else 0
-                    
                     # Визуальный прогресс-бар
                     bar_length = 20
                     filled = int(bar_length * percent / 100)
                     bar = '█' * filled + '░' * (bar_length - filled)
                     
                     # Красивый вывод в консоль
-                    text_preview = segment.text.strip()[:40]
                     sys.stdout.write(f"\r   🎤 [{bar}] {percent:3d}% | {self._seconds_to_hms(current_end)} | {text_preview}...")
                     sys.stdout.flush()
-                    
-                    seg_data = {
-                        "start": round(current_start, 2), 
-                        "end": round(current_end, 2), 
-                        "text": segment.text.strip()
-                    }
-                    pf.write(json.dumps(seg_data, ensure_ascii=False) + "\n")
-                    pf.flush()
-                    existing_segments.append(seg_data)
-                    processed_count += 1
-            
-            print(f"\n   ✓ Обработка завершена! Обработано сегментов: {processed_count}")
-            return existing_segments
-            
+                
+                seg_data = {
+                    "start": round(current_start, 2), 
+                    "end": round(current_end, 2), 
+                    "text": segment.text.strip()
+                }
+                if self.word_timestamps and segment.words:
+                    seg_data["words"] = [{
+                        "start": round(w.start, 2),
+                        "end": round(w.end, 2),
+                        "word": w.word,
+                        "probability": round(w.probability, 3)
+                    } for w in segment.words]
+                # Групповая запись: на диск пачками, а не flush на каждый сегмент
+                journal.append(seg_data)
+                processed_count += 1
+                if on_segment:
+                    on_segment(seg_data)
+            completed = True
         finally:
-            # ГАРАНТИРОВАННОЕ удаление временного файла
-            if temp_cut_file and os.path.exists(temp_cut_file):
-                try: 
-                    os.remove(temp_cut_file)
-                    print(f"   🧹 Временный файл удален")
-                except Exception as e:
-                    print(f"   ⚠️  Не удалось удалить temp файл: {e}")
-
-def get_audio_files(directory: str) -> List[str]:
-    files = []
+            # Остаток буфера сохраняется и при ошибке/остановке; готовый журнал сжимается
+            journal.close(complete=completed)
+        if cache_key:
+            self.transcript_cache.put(cache_key, progress_file)
+        
+        elapsed = time.perf_counter() - started
+        print(f"\n   ✓ Обработка завершена! Обработано сегментов: {processed_count}")
+        if elapsed > 0:
+            print(f"   ⚡ Скорость: x{media_duration / elapsed:.1f} реального времени ({elapsed:.0f} сек)")
+        if media_duration > 0:
+            metrics.gauge("rtf", elapsed / media_duration, component="transcription")
+        metrics.event("file_done", component="transcription", file=os.path.basename(audio_path),
+                      segments=processed_count, audio_sec=round(media_duration, 2), elapsed=round(elapsed, 2))
+        return list(journal.read_all()) if return_segments else None
+
+def outputs_ready(file_path: str, formats=DEFAULT_FORMATS) -> bool:
+    """Все выбранные форматы уже сохранены"""
+    base_path = os.path.splitext(file_path)[0]
+    return all(os.path.exists(output_path(base_path, fmt)) for fmt in formats)
+
+def plan_file(file_path: str, formats=DEFAULT_FORMATS) -> str:
+    """Что будет сделано с файлом (для --dry-run), без загрузки модели"""
+    if outputs_ready(file_path, formats):
+        return "skip"
+    checkpoint = ProgressJournal(f"{os.path.splitext(file_path)[0]}_PROGRESS.jsonl").checkpoint()
+    if checkpoint["complete"]:
+        return "export"
+    if checkpoint["count"]:
+        return f"resume {seconds_to_hms(checkpoint['end'])}"
+    return "new"
+
+def print_plan(target_files: List[str], formats=DEFAULT_FORMATS):
+    labels = {"skip": "⏭️  готово", "export": "💾 экспорт из журнала", "new": "🎤 новый"}
+    counts = {}
+    print(f"\n📋 План (модель не загружается):")
+    for i, file_path in enumerate(target_files, 1):
+        action = plan_file(file_path, formats)
+        kind = action.split()[0]
+        counts[kind] = counts.get(kind, 0) + 1
+        label = labels.get(kind) or f"🔄 продолжение с {action.split()[1]}"
+        print(f"      {i}. {os.path.basename(file_path)} — {label}")
+    print(f"\n   Итого: новых {counts.get('new', 0)} | продолжить {counts.get('resume', 0)} | "
+          f"экспорт {counts.get('export', 0)} | готово {counts.get('skip', 0)}")
+
+def process_file(app: AudioTranscriber, file_path: str, progress_callback=None, transcribe_fn=None,
+                 formats=DEFAULT_FORMATS) -> str:
+    """Транскрибирует один файл и сохраняет выбранные форматы. Возвращает 'done', 'skipped' или 'failed'.
+
+    transcribe_fn(path) — своя функция распознавания вместо app.transcribe (клиент сервера)
+    """
+    base_path = os.path.splitext(file_path)[0]
+    
+    # Пути выходных файлов (srt — для видео, txt — читаемый)
+    outputs = [output_path(base_path, fmt) for fmt in formats]
+    
+    # Если файлы уже есть, пропускаем
+    if outputs_ready(file_path, formats):
+         print(f"   ⏭️  Этот файл уже обработан, пропускаем.")
+         for f in outputs:
+             print(f"   📁 {os.path.basename(f)}")
+         return "skipped"
+
+    # Журнал уже полный (упали на экспорте, удалили субтитры): форматы собираются прямо из него,
+    # без модели и сервера — как в плане --dry-run ("экспорт из журнала")
+    journal = ProgressJournal(f"{base_path}_PROGRESS.jsonl")
+    try:
+        complete = journal.checkpoint()["complete"]
+    except Exception:
+        complete = False  # поврежденный журнал разберет transcribe
+    if complete:
+        print(f"   ✅ Файл уже распознан полностью, экспорт из журнала...")
+        try:
+            for fmt, path in export_journal(journal, base_path, formats).items():
+                print(f"   ✓ {fmt.upper()}: {os.path.basename(path)}")
+        except Exception as e:
+            print(f"   ❌ ОШИБКА экспорта {os.path.basename(file_path)}: {e}")
+            return "failed"
+        print(f"\n   🎉 ГОТОВО! Всего сегментов: {journal.checkpoint()['count']}")
+        return "done"
+        
+    # Сегменты сразу идут во все форматы (*.partial.* доступны, пока файл в работе)
+    exporter = MultiExporter(base_path, formats)
+    try:
+        if transcribe_fn:
+            for seg in transcribe_fn(file_path):
+                exporter.write(seg)
+        else:
+            app.transcribe(file_path, progress_callback=progress_callback, on_segment=exporter.write,
+                           return_segments=False)
+        
+        print(f"\n   💾 Сохранение результатов...")
+        for fmt, path in exporter.finish().items():
+            print(f"   ✓ {fmt.upper()}: {os.path.basename(path)}")
+        
+        print(f"\n   🎉 ГОТОВО! Всего сегментов: {exporter.count}")
+        return "done"
+        
+    except Exception as e:
+        exporter.abort()
+        print(f"\n   ❌ ОШИБКА при обработке {os.path.basename(file_path)}:")
+        print(f"   📝 Детали: {e}")
+        import traceback
+        print(f"\n   🔍 Полная трассировка:")
+        traceback.print_exc()
+        return "failed"
+    except BaseException:
+        exporter.abort()
+        raise
+
+def index_status(status: str) -> str:
+    """Статус process_file -> статус в индексе файлов"""
+    return STATUS_FAILED if status == "failed" else STATUS_DONE
+
+def drop_shadowed_pcm(files: List[str]) -> List[str]:
+    """*.pcm16k рядом с одноименным аудио не транскрибируется отдельно: аудио и так читается
+    через него (PCM от spleeter или кэш декодирования). Берется только *.pcm16k без пары."""
+    bases = {os.path.splitext(f)[0] for f in files if not f.lower().endswith(CACHE_EXT)}
+    return [f for f in files if not (f.lower().endswith(CACHE_EXT) and os.path.splitext(f)[0] in bases)]
+
+def get_audio_files(directory: str, index: FileIndex = None) -> List[str]:
     print(f"\n📂 Сканирую папку: {os.path.abspath(directory)}")
-    for root, _, filenames in os.walk(directory):
-        for filename in filenames:
-            # ИСКЛЮЧАЕМ временные файлы из обработки
-            if filename.startswith('temp_resume_'):
-                continue
-            if os.path.splitext(filename)[1].lower() in SUPPORTED_FORMATS:
-                files.append(os.path.join(root, filename))
+    # Индекс перечитывает только папки, где что-то изменилось (temp_resume_ убираются там же)
+    index = index or FileIndex(directory, SUPPORTED_FORMATS)
+    files = drop_shadowed_pcm(index.scan())
+    index.save()
     
     if files:
-        print(f"   ✓ Найдено аудиофайлов: {len(files)}")
+        print(f"   ✓ Найдено аудиофайлов: {len(files)} (новых или измененных: {len(index.changed)})")
         for i, f in enumerate(files, 1):
             print(f"      {i}. {os.path.basename(f)}")
     else:
         print(f"   ℹ️  Аудиофайлы не найдены")
     
-    return sorted(files)
+    return files
+
+def watch_directory(index: FileIndex, handle_file, interval: float = DEFAULT_WATCH_INTERVAL,
+                    formats=DEFAULT_FORMATS):
+    """Непрерывный прием: новые файлы берутся в работу без перезапуска (модель уже загружена).
+    Файл берется, когда он не менялся interval секунд (копирование закончилось)"""
+    print(f"\n👀 Режим наблюдения: {index.root}")
+    print(f"   Проверка каждые {interval:.0f} сек, остановка — Ctrl+C")
+    cycle = 0
+    while True:
+        files = index.scan()
+        # Дописанный или перезаписанный на месте файл не меняет mtime папки: ожидающие файлы
+        # перепроверяются каждый раз (копирование еще идет?), все остальные — раз в WATCH_FULL_CHECK
+        index.refresh(files if cycle % WATCH_FULL_CHECK == 0 else index.pending())
+        cycle += 1
+        now = time.time()
+        ready = [p for p in drop_shadowed_pcm(index.pending()) if now - index.get(p)["mtime_ns"] / 1e9 >= interval]
+        for file_path in ready:
+            print(f"\n" + "="*70)
+            print(f"📥 Новый файл: {os.path.basename(file_path)}")
+            print("="*70)
+            index.set_status(file_path, index_status(handle_file(file_path)), formats)
+            index.save()
+        index.save()
+        time.sleep(interval)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="AI Транскрибатор аудио")
     parser.add_argument("path", nargs="?", default=".", help="Путь к папке с аудио или конкретному файлу")
-    parser.add_argument("--model", default=DEFAULT_MODEL, help="Размер модели (tiny, base, small, medium, large-v3)")
+    parser.add_argument("--model", default=None, help=f"Размер модели (tiny, base, small, medium, large-v3; по умолчанию {DEFAULT_MODEL}, с --server — модель сервера по умолчанию)")
     parser.add_argument("--device", default="auto", help="Устройство (cuda, cpu, auto)")
     parser.add_argument("--ffmpeg", default=None, help="Путь к ffmpeg.exe вручную")
+    parser.add_argument("--batch-size", type=int, default=0, help="Пакетный режим: сколько окон речи декодировать за раз (0 = выкл)")
+    parser.add_argument("--compare-batch", action="store_true", help="Сравнить скорость пакетного и обычного режима на первом файле и выйти")
+    parser.add_argument("--workers", type=int, default=1, help="Сколько файлов обрабатывать параллельно (процессов, у каждого своя модель)")
+    parser.add_argument("--span-workers", type=int, default=1, help="Резать длинный файл по паузам и распознавать куски параллельно (потоков)")
+    parser.add_argument("--journal-flush-segments", type=int, default=DEFAULT_FLUSH_EVERY, help="Сбрасывать прогресс на диск каждые N сегментов")
+    parser.add_argument("--journal-flush-sec", type=float, default=DEFAULT_FLUSH_INTERVAL, help="...или не реже чем раз в N секунд")
+    parser.add_argument("--formats", type=parse_formats, default=DEFAULT_FORMATS, help="Форматы через запятую: srt,vtt,txt,json")
+    parser.add_argument("--word-timestamps", action="store_true", help="Таймкоды для каждого слова (попадают в JSON)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Папка кэша готовых транскриптов")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB, help="Лимит кэша транскриптов (МБ), старые удаляются")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш транскриптов")
+    parser.add_argument("--watch", action="store_true", help="Следить за папкой и распознавать новые файлы без перезапуска")
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_WATCH_INTERVAL, help="Как часто проверять папку (сек)")
+    parser.add_argument("--dry-run", action="store_true", help="Показать, что будет обработано, и выйти (модель не грузится)")
+    parser.add_argument("--server", default=None, help="Адрес запущенного server.py (например http://127.0.0.1:8765) — модель не грузится")
+    parser.add_argument("--metrics-jsonl", default=None, help="Писать события (JSON lines) в этот файл")
+    parser.add_argument("--metrics-prom", default=None, help="Файл метрик для Prometheus (textfile-коллектор node_exporter)")
     args = parser.parse_args()
+    configure_metrics(args.metrics_jsonl, args.metrics_prom)
+    print("🔁 Инициализация скрипта...", flush=True)
     
-    # 🧹 ОЧИСТКА старых временных файлов при запуске
-    cleanup_dir = args.path if os.path.isdir(args.path) else os.path.dirname(args.path)
-    if os.path.exists(cleanup_dir):
-        for filename in os.listdir(cleanup_dir):
-            if filename.startswith('temp_resume_') and filename.endswith('.wav'):
-                temp_path = os.path.join(cleanup_dir, filename)
-                try:
-                    os.remove(temp_path)
-                    print(f"🧹 Удален старый временный файл: {filename}")
-                except Exception as e:
-                    print(f"⚠️  Не удалось удалить {filename}: {e}")
-
-    # Сбор файлов
+    # Сбор файлов (старые temp_resume_*.wav удаляются при сканировании)
     target_files = []
+    index = None
     if os.path.isfile(args.path):
         target_files = [args.path]
     else:
-        target_files = get_audio_files(args.path)
+        index = FileIndex(args.path, SUPPORTED_FORMATS)
+        target_files = get_audio_files(args.path, index)
+
+    if args.watch and index is None:
+        print("\n❌ --watch работает только с папкой.")
+        sys.exit(1)
+
+    if args.watch and args.workers > 1 and not args.server:
+        # Пул процессов раздает готовый список файлов; очередь наблюдения — только в одном процессе
+        print("\n❌ --watch не работает вместе с --workers > 1: уберите --workers "
+              "или запустите по процессу на папку.")
+        sys.exit(1)
 
-    if not target_files:
+    if not target_files and not args.watch:
         print("\n❌ Аудиофайлов не найдено. Проверьте путь.")
         sys.exit(0)
 
+    if args.dry_run:
+        print_plan(target_files, args.formats)
+        sys.exit(0)
+
+    # Готовые файлы отсеиваются до загрузки модели: если делать нечего, модель не нужна.
+    # По индексу — без stat: выходные файлы проверяются только в папках, где что-то менялось,
+    # и у файлов, для которых индекс не помнит всех запрошенных --formats
+    is_done = lambda f: (index is not None and index.known_done(f, args.formats)) or outputs_ready(f, args.formats)
+    done_files = set() if args.compare_batch else {f for f in target_files if is_done(f)}
+    if done_files:
+        print(f"\n   ⏭️  Уже обработано файлов: {len(done_files)}, пропускаем")
+        if index:
+            for file_path in done_files:
+                index.set_status(file_path, STATUS_DONE, args.formats)
+            index.save()
+        target_files = [f for f in target_files if f not in done_files]
+    if not target_files and not args.watch:
+        print(f"\n✅ ВСЕ ФАЙЛЫ УЖЕ ОБРАБОТАНЫ!")
+        sys.exit(0)
+
+    app_kwargs = dict(
+        model_size=args.model or DEFAULT_MODEL,
+        device=args.device, 
+        compute_type=None,  # float16 на GPU, int8 на CPU — определяется при загрузке модели
+        ffmpeg_path=args.ffmpeg,
+        batch_size=args.batch_size,
+        span_workers=args.span_workers,
+        journal_flush_every=args.journal_flush_segments,
+        journal_flush_interval=args.journal_flush_sec,
+        word_timestamps=args.word_timestamps,
+        transcript_cache=None if args.no_cache else TranscriptCache(args.cache_dir, args.cache_size_mb * 1024**2)
+    )
+
+    if args.server:
+        # Клиент: модель уже загружена в server.py, здесь только отправка файлов.
+        # Без --model сервер берет свою модель по умолчанию (первую из его --models)
+        from client import TranscriptionClient
+        client = TranscriptionClient(args.server, model=args.model)
+        handle_file = lambda path: process_file(None, path, transcribe_fn=client.transcribe, formats=args.formats)
+        try:
+            for i, file_path in enumerate(target_files, 1):
+                print(f"\n" + "="*70)
+                print(f"📄 Файл {i}/{len(target_files)}: {os.path.basename(file_path)}")
+                print("="*70)
+                status = handle_file(file_path)
+                if index:
+                    index.set_status(file_path, index_status(status), args.formats)
+                    index.save()
+            if args.watch:
+                watch_directory(index, handle_file, args.watch_interval, args.formats)
+        except KeyboardInterrupt:
+            print(f"\n\n   ⏸️  ОСТАНОВЛЕНО ПОЛЬЗОВАТЕЛЕМ")
+            print(f"   💡 Прогресс сохранен на сервере! Запустите снова для продолжения.")
+        sys.exit(0)
+
+    if args.workers > 1:
+        # Несколько процессов: у каждого своя модель и своя доля ядер
+        from worker_pool import run_worker_pool
+        on_done = None
+        if index:
+            def on_done(path, status):
+                index.set_status(path, index_status(status), args.formats)
+                index.save()
+        run_worker_pool(target_files, args.workers, app_kwargs, formats=args.formats, on_done=on_done)
+        sys.exit(0)
+
     try:
-        app = AudioTranscriber(
-            model_size=args.model, 
-            device=args.device, 
-            compute_type="float16" if args.device == "cuda" or (args.device=="auto" and torch.cuda.is_available()) else "int8",
-            ffmpeg_path=args.ffmpeg
-        )
+        app = AudioTranscriber(**app_kwargs)
     except Exception as e:
         print(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА при загрузке модели: {e}")
         print(f"   💡 Проверьте подключение к интернету и наличие свободного места")
         sys.exit(1)
 
-    for i, file_path in enumerate(target_files, 1):
-        filename = os.path.basename(file_path)
-        base_path = os.path.splitext(file_path)[0]
-        
-        # Пути выходных файлов
-        srt_file = base_path + ".srt"
-        txt_file = base_path + ".txt" # Читаемый
-        
-        print(f"\n" + "="*70)
-        print(f"📄 Файл {i}/{len(target_files)}: {filename}")
-        print("="*70)
-        
-        # Если файлы уже есть, пропускаем
-        if os.path.exists(srt_file) and os.path.exists(txt_file):
-             print(f"   ⏭️  Этот файл уже обработан, пропускаем.")
-             print(f"   📁 SRT: {os.path.basename(srt_file)}")
-             print(f"   📁 TXT: {os.path.basename(txt_file)}")
-             continue
-            
-        try:
-            segments = app.transcribe(file_path)
-            
-            print(f"\n   💾 Сохранение результатов...")
-            # Сохраняем SRT (для видео)
-            app.export_srt(segments, srt_file)
-            print(f"   ✓ SRT: {os.path.basename(srt_file)}")
-            
-            # Сохраняем читаемый текст (для чтения)
-            app.export_readable(segments, txt_file)
-            print(f"   ✓ TXT: {os.path.basename(txt_file)}")
-            
-            print(f"\n   🎉 ГОТОВО! Всего сегментов: {len(segments)}")
-            
-        except KeyboardInterrupt:
-            print(f"\n\n   ⏸️  ОСТАНОВЛЕНО ПОЛЬЗОВАТЕЛЕМ")
-            print(f"   💡 Прогресс сохранен! Запустите снова для продолжения.")
-            sys.exit(0)
-        except Exception as e:
-            print(f"\n   ❌ ОШИБКА при обработке {filename}:")
-            print(f"   📝 Детали: {e}")
-            import traceback
-            print(f"\n   🔍 Полная трассировка:")
-            traceback.print_exc()
+    if args.compare_batch:
+        app.compare_batched(target_files[0])
+        sys.exit(0)
+
+    handle_file = lambda path: process_file(app, path, formats=args.formats)
+    try:
+        for i, file_path in enumerate(target_files, 1):
+            print(f"\n" + "="*70)
+            print(f"📄 Файл {i}/{len(target_files)}: {os.path.basename(file_path)}")
+            print("="*70)
+            status = handle_file(file_path)
+            if index:
+                index.set_status(file_path, index_status(status), args.formats)
+                index.save()
+        if args.watch:
+            # Модель остается в памяти, новые файлы встают в очередь по мере появления
+            watch_directory(index, handle_file, args.watch_interval, args.formats)
+    except KeyboardInterrupt:
+        print(f"\n\n   ⏸️  ОСТАНОВЛЕНО ПОЛЬЗОВАТЕЛЕМ")
+        print(f"   💡 Прогресс сохранен! Запустите снова для продолжения.")
+        sys.exit(0)
     
     print(f"\n" + "="*70)
     print(f"✅ ВСЕ ФАЙЛЫ ОБРАБОТАНЫ!")
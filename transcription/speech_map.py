@@ -0,0 +1,125 @@
+import os
+import json
+from dataclasses import asdict
+from typing import List
+
+import numpy as np
+
+from audio_cache import SAMPLE_RATE, as_float32
+
+# --- КАРТА РЕЧИ (VAD), СОХРАНЕННАЯ РЯДОМ С АУДИО ---
+# Silero VAD по всему файлу считается один раз и лежит в *.vad.json (параметры VAD +
+# отпечаток исходника). Продолжение, повторный запуск и другая --model берут готовую карту:
+# модель получает только участки речи, тишина пропускается без пересчета VAD.
+
+SPEECH_MAP_EXT = ".vad.json"
+MAP_VERSION = 1
+
+# Те же параметры, что faster-whisper берет сам при vad_filter=True
+SEQUENTIAL_VAD = {}
+BATCHED_VAD = {"max_speech_duration_s": 30, "min_silence_duration_ms": 160}
+BATCH_WINDOW_SEC = 30  # окно пакетного декодера (chunk_length Whisper)
+
+
+def speech_map_path(audio_path: str) -> str:
+    return os.path.splitext(audio_path)[0] + SPEECH_MAP_EXT
+
+
+def _vad_options(params: dict):
+    from faster_whisper.vad import VadOptions
+    return VadOptions(**params)
+
+
+def _fingerprint(audio_path: str, num_samples: int) -> dict:
+    st = os.stat(audio_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "num_samples": int(num_samples)}
+
+
+def _load(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if data.get("version") == MAP_VERSION else {}
+
+
+def _save(path: str, data: dict):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def get_speech_chunks(audio_path: str, audio: np.ndarray, params: dict = None) -> List[dict]:
+    """Участки речи всего файла [{'start': сэмпл, 'end': сэмпл}] — из *.vad.json или через VAD"""
+    options = asdict(_vad_options(params or SEQUENTIAL_VAD))
+    key = json.dumps(options, sort_keys=True)
+    path = speech_map_path(audio_path)
+    fingerprint = _fingerprint(audio_path, len(audio))
+
+    data = _load(path)
+    if data.get("source") != fingerprint:
+        data = {"version": MAP_VERSION, "source": fingerprint, "maps": {}}
+    if key in data["maps"]:
+        return [{"start": start, "end": end} for start, end in data["maps"][key]]
+
+    from faster_whisper.vad import get_speech_timestamps
+    print(f"   🗣  Поиск речи (VAD): {os.path.basename(path)}")
+    chunks = get_speech_timestamps(as_float32(np.asarray(audio)), _vad_options(params or SEQUENTIAL_VAD),
+                                   sampling_rate=SAMPLE_RATE)
+    data["maps"][key] = [[c["start"], c["end"]] for c in chunks]
+    try:
+        _save(path, data)
+    except OSError as e:
+        print(f"   ⚠️  Не удалось сохранить карту речи: {e}")
+
+    speech = sum(c["end"] - c["start"] for c in chunks) / SAMPLE_RATE
+    print(f"   🗣  Речи: {speech / 60:.1f} из {len(audio) / SAMPLE_RATE / 60:.1f} мин")
+    return chunks
+
+
+def clip_chunks(chunks: List[dict], start_sample: int = 0, end_sample: int = None) -> List[dict]:
+    """Участки речи внутри [start_sample, end_sample); крайние обрезаются"""
+    clipped = []
+    for c in chunks:
+        start = max(c["start"], start_sample)
+        end = c["end"] if end_sample is None else min(c["end"], end_sample)
+        if end > start:
+            clipped.append({"start": start, "end": end})
+    return clipped
+
+
+def transcribe_speech(model, audio: np.ndarray, chunks: List[dict], **kwargs):
+    """Распознать только участки речи; таймкоды сегментов — относительно начала файла.
+
+    model — WhisperModel, kwargs — как у model.transcribe (language, word_timestamps...)
+    """
+    if not chunks:
+        return iter(())
+    from faster_whisper.transcribe import restore_speech_timestamps
+    # Склеенная речь (в памяти только она), как делает сам vad_filter=True
+    speech_audio = np.concatenate([as_float32(np.asarray(audio[c["start"]:c["end"]])) for c in chunks])
+    segments, _ = model.transcribe(speech_audio, vad_filter=False, **kwargs)
+    return restore_speech_timestamps(segments, chunks, SAMPLE_RATE)
+
+
+def transcribe_speech_batched(pipeline, audio: np.ndarray, chunks: List[dict], window_sec: float = BATCH_WINDOW_SEC,
+                              **kwargs):
+    """То же для BatchedInferencePipeline, как его собственный vad_filter=True: речь склеивается и
+    режется на окна до window_sec (collect_chunks), окна уходят как clip_timestamps склеенного звука.
+    Участки VAD по отдельности нельзя: каждый стал бы своим коротким окном и пачки бы опустели"""
+    if not chunks:
+        return iter(())
+    from faster_whisper.transcribe import restore_speech_timestamps
+    from faster_whisper.vad import collect_chunks
+    if audio.dtype != np.float32:
+        audio = as_float32(audio)  # collect_chunks склеивает с float32 — int16 надо перевести заранее
+    windows, _ = collect_chunks(audio, chunks, SAMPLE_RATE, max_duration=window_sec)
+    windows = [w for w in windows if len(w)]
+    clips, offset = [], 0
+    for window in windows:
+        clips.append({"start": offset / SAMPLE_RATE, "end": (offset + len(window)) / SAMPLE_RATE})
+        offset += len(window)
+    segments, _ = pipeline.transcribe(np.concatenate(windows), clip_timestamps=clips, **kwargs)
+    return restore_speech_timestamps(segments, chunks, SAMPLE_RATE)
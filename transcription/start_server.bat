@@ -0,0 +1,7 @@
+@echo off
+chcp 65001 > nul
+
+python server.py
+
+echo.
+pause
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+# --- КЭШ ГОТОВЫХ ТРАНСКРИПТОВ ---
+# Ключ = отпечаток декодированного звука (16 кГц моно) + модель, тип вычислений, язык и VAD.
+# Переименованная, перенесенная или скопированная запись берется из кэша мгновенно.
+# Хранится сжатый журнал (*.jsonl), старые записи удаляются при превышении лимита.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "transcription_cache")
+DEFAULT_CACHE_SIZE_MB = 1024
+
+HASH_BLOCK = 16000 * 60  # сэмплов (минута звука) за один вызов update()
+
+
+def audio_fingerprint(audio: np.ndarray) -> str:
+    """sha256 по сэмплам; memmap читается блоками, весь файл в память не грузится"""
+    h = hashlib.sha256()
+    h.update(f"{audio.dtype.str}:{len(audio)}".encode("ascii"))
+    for start in range(0, len(audio), HASH_BLOCK):
+        h.update(np.ascontiguousarray(audio[start:start + HASH_BLOCK]).tobytes())
+    return h.hexdigest()
+
+
+class TranscriptCache:
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE_MB * 1024**2):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(fingerprint: str, settings: dict) -> str:
+        h = hashlib.sha256(fingerprint.encode("ascii"))
+        h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.jsonl")
+
+    def get(self, key: str):
+        """Путь к закэшированному журналу или None"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path)  # отметка для LRU
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, journal_path: str):
+        path = self._path(key)
+        temp_path = path + f".{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(journal_path, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"   ⚠️  Не удалось сохранить в кэш: {e}")
+            if os.path.exists(temp_path):
+                try: os.remove(temp_path)
+                except OSError: pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаляет самые давно использованные транскрипты, пока кэш больше лимита"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".jsonl"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
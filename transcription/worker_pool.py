@@ -0,0 +1,120 @@
+import io
+import os
+import sys
+import time
+import contextlib
+import multiprocessing as mp
+from typing import List
+
+from exporters import DEFAULT_FORMATS
+
+# --- ПУЛ ПРОЦЕССОВ: ФАЙЛЫ ДЕЛЯТСЯ МЕЖДУ ЯДРАМИ ---
+# Каждый процесс держит свою модель и свою долю cpu_threads, файлы берет из общей очереди.
+# Возобновление по *_PROGRESS.jsonl работает как обычно: один файл — один процесс.
+
+
+def _worker(worker_id: int, task_queue, event_queue, app_kwargs: dict, formats):
+    # Вывод процесса не должен рвать общую строку прогресса — собираем его в буфер
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            from speechToText import AudioTranscriber, process_file
+            app = AudioTranscriber(**app_kwargs)
+    except Exception as e:
+        event_queue.put(("error", worker_id, None, f"{e}\n{log.getvalue()}"))
+        return
+    event_queue.put(("ready", worker_id))
+
+    while True:
+        path = task_queue.get()
+        if path is None:
+            break
+        event_queue.put(("start", worker_id, path))
+
+        def on_progress(percent, seconds, text):
+            event_queue.put(("progress", worker_id, percent))
+
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            status = process_file(app, path, progress_callback=on_progress, formats=formats)
+        if status == "failed":
+            event_queue.put(("error", worker_id, path, log.getvalue()))
+        event_queue.put(("done", worker_id, path, status))
+
+
+def run_worker_pool(target_files: List[str], workers: int, app_kwargs: dict, formats=None, on_done=None):
+    """on_done(path, status) — вызывается в главном процессе после каждого файла"""
+    formats = formats or DEFAULT_FORMATS
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    app_kwargs = dict(app_kwargs, cpu_threads=threads)
+    print(f"\n🧵 Пул процессов: {workers} x {threads} потоков, файлов: {len(target_files)}")
+
+    ctx = mp.get_context("spawn")
+    task_queue = ctx.Queue()
+    event_queue = ctx.Queue()
+    for path in target_files:
+        task_queue.put(path)
+    for _ in range(workers):
+        task_queue.put(None)
+
+    processes = [ctx.Process(target=_worker, args=(w, task_queue, event_queue, app_kwargs, formats), daemon=True)
+                 for w in range(workers)]
+    for p in processes:
+        p.start()
+
+    state = {w: "загрузка модели" for w in range(workers)}
+    counts = {"done": 0, "skipped": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def render():
+        finished = sum(counts.values())
+        slots = " | ".join(f"W{w + 1}: {state[w]}" for w in range(workers))
+        sys.stdout.write(f"\r   🎤 [{finished}/{len(target_files)}] {slots}\033[K")
+        sys.stdout.flush()
+
+    try:
+        while any(p.is_alive() for p in processes) or not event_queue.empty():
+            try:
+                event = event_queue.get(timeout=0.5)
+            except Exception:
+                continue
+
+            kind, worker_id = event[0], event[1]
+            if kind == "ready":
+                state[worker_id] = "готов"
+            elif kind == "start":
+                state[worker_id] = f"{os.path.basename(event[2])[:25]} 0%"
+            elif kind == "progress":
+                name = state[worker_id].rsplit(" ", 1)[0]
+                state[worker_id] = f"{name} {event[2]}%"
+            elif kind == "done":
+                counts[event[3]] += 1
+                state[worker_id] = "готов"
+                sys.stdout.write(f"\r   ✓ {os.path.basename(event[2])}: {event[3]}\033[K\n")
+                if on_done:
+                    on_done(event[2], event[3])
+            elif kind == "error":
+                target = os.path.basename(event[2]) if event[2] else "загрузка модели"
+                sys.stdout.write(f"\r   ❌ W{worker_id + 1} ({target}):\033[K\n{event[3]}\n")
+                if event[2] is None:
+                    state[worker_id] = "остановлен"
+            render()
+    except KeyboardInterrupt:
+        print(f"\n\n   ⏸️  ОСТАНОВЛЕНО ПОЛЬЗОВАТЕЛЕМ")
+        print(f"   💡 Прогресс сохранен! Запустите снова для продолжения.")
+        for p in processes:
+            p.terminate()
+        return counts
+
+    for p in processes:
+        p.join()
+
+    elapsed = time.perf_counter() - started
+    unfinished = len(target_files) - sum(counts.values())
+    if unfinished:
+        print(f"\n\n   ⚠️  Не обработано файлов: {unfinished} (процессы завершились с ошибкой)")
+    print(f"\n\n" + "="*70)
+    print(f"✅ ВСЕ ФАЙЛЫ ОБРАБОТАНЫ! Готово: {counts['done']} | пропущено: {counts['skipped']} | ошибок: {counts['failed']}")
+    print(f"   ⏱ Время: {elapsed / 60:.1f} мин")
+    print("="*70)
+    return counts